@@ -0,0 +1,234 @@
+"""Offline throughput benchmark against local Intract and JSON-RPC stand-ins.
+
+    python benchmarks/run.py --wallets 200 --concurrency 20 --rpc-latency 0.05
+
+Every run works in a throwaway directory, so caches, state.db and result files
+from real runs are never touched. Sleeps between actions are scaled to zero
+to measure the work itself.
+"""
+
+import argparse
+import json
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from functools import wraps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.servers import IntractServer, RpcServer
+
+SCENARIOS = ["check_balance", "mint", "send_token"]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, step, seconds):
+        with self.lock:
+            self.samples[step].append(seconds)
+
+    def wrap(self, owner, name, step=None):
+        func = getattr(owner, name)
+        step = step or name
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(step, time.perf_counter() - started)
+
+        setattr(owner, name, wrapper)
+
+    def percentile(self, values, pct):
+        values = sorted(values)
+        index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+        return values[index]
+
+    def summary(self):
+        return {
+            step: {
+                "count": len(values),
+                "p50_ms": round(self.percentile(values, 50) * 1000, 2),
+                "p99_ms": round(self.percentile(values, 99) * 1000, 2),
+            }
+            for step, values in sorted(self.samples.items())
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rpc-latency", type=float, default=0.05)
+    parser.add_argument("--intract-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--rpc-endpoints", type=int, default=1, help="nodes per chain")
+    parser.add_argument(
+        "--stall-rate", type=float, default=0.0, help="share of 2s RPC stalls"
+    )
+    parser.add_argument(
+        "--stuck-rate", type=float, default=0.0, help="share of never-mined txs"
+    )
+    parser.add_argument(
+        "--replace-after", type=float, default=3.0, help="seconds before a fee bump"
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, help="requests/second each server accepts"
+    )
+    parser.add_argument("--send-batch-size", type=int, default=50)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument(
+        "--profile", help="write per-scenario profiles to this directory"
+    )
+    return parser.parse_args()
+
+
+def prepare_workdir(wallets):
+    workdir = tempfile.mkdtemp(prefix="voyager-bench-")
+    shutil.copytree(
+        os.path.join(ROOT, "data", "abi"), os.path.join(workdir, "data", "abi")
+    )
+
+    with open(os.path.join(workdir, "keys.txt"), "w") as f:
+        f.writelines("0x" + secrets.token_hex(32) + "\n" for _ in range(wallets))
+
+    open(os.path.join(workdir, "proxies.txt"), "w").close()
+    os.chdir(workdir)
+
+    return workdir
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    profiles = os.path.abspath(args.profile) if args.profile else None
+    workdir = prepare_workdir(args.wallets)
+
+    intract = IntractServer(
+        latency=args.intract_latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+    ).start()
+
+    import settings
+
+    settings.USE_PROXY = False
+    settings.SHUFFLE_WALLETS = False
+    settings.CONCURRENCY = args.concurrency
+    settings.SLEEP_BETWEEN_WALLETS = [0, 0]
+    settings.SEND_BATCH_SIZE = args.send_batch_size
+    settings.REPLACE_AFTER = args.replace_after
+
+    from modules import config
+
+    servers = [intract]
+    for chain in config.CHAIN_DATA.values():
+        nodes = [
+            RpcServer(
+                chain_id=chain["chain_id"],
+                latency=args.rpc_latency,
+                error_rate=args.error_rate,
+                throttle_rate=args.throttle_rate,
+                rate_limit=args.rate_limit,
+                stall_rate=args.stall_rate,
+                stuck_rate=args.stuck_rate,
+            ).start()
+            for _ in range(args.rpc_endpoints)
+        ]
+        chain["rpc"] = [node.url for node in nodes]
+        servers.extend(nodes)
+
+    import main as app
+    from modules import intract as intract_module
+    from modules.engine import run_wallets
+    from modules.intract import Intract
+    from modules.keys import KeyFile
+    from modules.metrics import metrics
+    from modules.profiling import Profiler
+    from modules.ratelimit import limiter
+    from modules.scheduler import scheduler
+    from modules.sinks import close_sinks
+    from modules.wallet import Wallet
+
+    intract_module.INTRACT_API = f"{intract.url}/api/qv1"
+    scheduler.time_scale = 0
+
+    recorder = Recorder()
+    for name in [
+        "auth",
+        "get_nft_balance",
+        "get_claim_data",
+        "mint",
+        "get_user_id",
+        "set_primary_identity",
+        "verify_task",
+        "fetch_journey",
+    ]:
+        recorder.wrap(Intract, name, f"intract.{name}")
+    recorder.wrap(Wallet, "await_tx", "wallet.await_tx")
+    recorder.wrap(app, "mint", "wallet.mint_flow")
+
+    keys = KeyFile("keys.txt")
+    report = {"wallets": args.wallets, "concurrency": args.concurrency, "scenarios": {}}
+
+    for scenario in args.scenarios.split(","):
+        requests_before = sum(server.requests for server in servers)
+        rejected_before = sum(server.rejected for server in servers)
+        stuck_before = sum(len(getattr(server, "stuck", ())) for server in servers)
+        profiler = Profiler(scenario, profiles) if profiles else nullcontext()
+        started = time.perf_counter()
+
+        with profiler:
+            if scenario == "check_balance":
+                app.check_balance(keys)
+            elif scenario == "mint":
+                nft_balances = app.get_nft_balances(keys)
+                jobs = app.get_jobs("mint", keys, [], nft_balances)
+                run_wallets(jobs, concurrency=args.concurrency)
+            elif scenario == "send_token":
+                app.send_tokens(keys)
+            else:
+                raise SystemExit(f"Unknown scenario {scenario}")
+
+        elapsed = time.perf_counter() - started
+        report["scenarios"][scenario] = {
+            "seconds": round(elapsed, 3),
+            "wallets_per_minute": round(args.wallets / elapsed * 60, 1),
+            "http_requests": sum(server.requests for server in servers)
+            - requests_before,
+            "rejected": sum(server.rejected for server in servers) - rejected_before,
+            "stuck_txs": sum(len(getattr(server, "stuck", ())) for server in servers)
+            - stuck_before,
+        }
+
+    close_sinks()
+    report["steps"] = recorder.summary()
+    report["endpoints"] = metrics.snapshot()
+    report["rate_limits"] = limiter.rates()
+    print(json.dumps(report, indent=2))
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    os.chdir(ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
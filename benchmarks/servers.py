@@ -0,0 +1,328 @@
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from eth_abi import decode, encode
+from eth_utils import keccak, to_checksum_address
+
+SELECTORS = {
+    "70a08231": ("balanceOf", ["uint256"]),
+    "06fdde03": ("name", ["string"]),
+    "95d89b41": ("symbol", ["string"]),
+    "313ce567": ("decimals", ["uint8"]),
+    "dd62ed3e": ("allowance", ["uint256"]),
+}
+AGGREGATE3 = "82ad56cb"
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        handler,
+        latency=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        rate_limit=None,
+        stall_rate=0.0,
+        stall_seconds=2.0,
+    ):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.rejected = 0
+        self.window = (0, 0)
+        self.lock = threading.Lock()
+
+    def over_limit(self):
+        """Fixed one-second window, like most public RPC plans"""
+        if not self.rate_limit:
+            return False
+
+        with self.lock:
+            second, count = self.window
+            now = int(time.monotonic())
+            count = count + 1 if now == second else 1
+            self.window = (now, count)
+
+            return count > self.rate_limit
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def throttled(self):
+        with self.server.lock:
+            self.server.requests += 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # Occasional slow answers give the latency distribution a real tail
+        if random.random() < self.server.stall_rate:
+            time.sleep(self.server.stall_seconds)
+
+        if self.server.over_limit() or random.random() < self.server.throttle_rate:
+            with self.server.lock:
+                self.server.rejected += 1
+
+            self.send_json({"message": "Too Many Requests"}, status=429)
+            return True
+
+        return False
+
+
+class RpcHandler(Handler):
+    """JSON-RPC node stand-in with every call the bot makes answered from memory"""
+
+    def do_POST(self):
+        if self.throttled():
+            return
+
+        payload = self.read_json()
+
+        if isinstance(payload, list):
+            self.send_json([self.answer(item) for item in payload])
+        else:
+            self.send_json(self.answer(payload))
+
+    def answer(self, request):
+        if random.random() < self.server.error_rate:
+            return {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "error": {"code": -32000, "message": "injected failure"},
+            }
+
+        result = self.call(request["method"], request.get("params") or [])
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def call(self, method, params):
+        if method == "eth_chainId":
+            return hex(self.server.chain_id)
+        if method in ("eth_gasPrice", "eth_maxPriorityFeePerGas"):
+            return hex(10**9)
+        if method == "eth_blockNumber":
+            return hex(self.server.block_number())
+        if method == "eth_getBalance":
+            return hex(10**18)
+        if method == "eth_getTransactionCount":
+            return "0x0"
+        if method == "eth_estimateGas":
+            return hex(200_000)
+        if method == "eth_getCode":
+            return "0x00"
+        if method == "eth_getLogs":
+            return []
+        if method == "eth_getBlockByNumber":
+            return {
+                "number": hex(self.server.block_number()),
+                "hash": "0x" + "00" * 32,
+                "parentHash": "0x" + "00" * 32,
+                "baseFeePerGas": hex(10**9),
+                "gasLimit": hex(30_000_000),
+                "gasUsed": "0x0",
+                "timestamp": hex(int(time.time())),
+                "extraData": "0x",
+                "transactions": [],
+            }
+        if method == "eth_sendRawTransaction":
+            tx_hash = "0x" + keccak(hexstr=params[0]).hex()
+
+            if random.random() < self.server.stuck_rate:
+                with self.server.lock:
+                    self.server.stuck.add(tx_hash)
+
+            return tx_hash
+        if method == "eth_getTransactionByHash":
+            return None
+        if method == "eth_getTransactionReceipt":
+            if params[0] in self.server.stuck:
+                return None
+
+            return {
+                "transactionHash": params[0],
+                "status": "0x1",
+                "blockNumber": hex(self.server.block_number()),
+                "gasUsed": hex(21000),
+                "logs": [],
+            }
+        if method == "eth_call":
+            return self.eth_call(params[0]["data"])
+
+        raise ValueError(f"Unsupported method {method}")
+
+    def eth_call(self, data):
+        data = data.removeprefix("0x")
+        selector, args = data[:8], bytes.fromhex(data[8:])
+
+        if selector == AGGREGATE3:
+            (calls,) = decode(["(address,bool,bytes)[]"], args)
+            results = [
+                (True, bytes.fromhex(self.eth_call(call_data.hex())[2:]))
+                for _, _, call_data in calls
+            ]
+            return "0x" + encode(["(bool,bytes)[]"], [results]).hex()
+
+        name, output = SELECTORS[selector]
+        values = {
+            "balanceOf": self.server.nft_balance,
+            "name": "0G Voyager",
+            "symbol": "A0GI",
+            "decimals": 18,
+            "allowance": 0,
+        }
+        return "0x" + encode(output, [values[name]]).hex()
+
+
+class RpcServer(FakeServer):
+    def __init__(
+        self, chain_id=1, block_time=2.0, nft_balance=0, stuck_rate=0.0, **kwargs
+    ):
+        super().__init__(RpcHandler, **kwargs)
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.nft_balance = nft_balance
+        # Share of sent transactions that are never mined, only a re-send gets a receipt
+        self.stuck_rate = stuck_rate
+        self.stuck = set()
+        self.started_at = time.time()
+
+    def block_number(self):
+        return 1_000_000 + int((time.time() - self.started_at) / self.block_time)
+
+
+class IntractHandler(Handler):
+    """Intract quest API stand-in covering the endpoints the bot calls"""
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def route(self, method):
+        if self.throttled():
+            return
+
+        path = urlparse(self.path).path.removeprefix("/api/qv1")
+        payload = self.read_json() if method == "POST" else None
+        routes = {
+            ("POST", "/auth/generate-nonce"): self.generate_nonce,
+            ("POST", "/auth/wallet"): self.auth_wallet,
+            ("GET", "/auth/get-user"): self.get_user,
+            ("POST", "/auth/set-primary-task-identity"): self.success,
+            ("GET", "/compass-nft/claim-signature"): self.claim_signature,
+            ("POST", "/task/verify-v2"): self.verify_task,
+            ("GET", "/journey/fetch"): self.fetch_journey,
+        }
+
+        handler = routes.get((method, path))
+        if handler is None:
+            self.send_json({"message": "Not found"}, status=404)
+            return
+
+        if random.random() < self.server.error_rate:
+            self.send_json({"message": "injected failure"}, status=500)
+            return
+
+        handler(payload)
+
+    def logged_in(self):
+        return "auth-token=" in (self.headers.get("Cookie") or "")
+
+    def generate_nonce(self, payload):
+        self.send_json({"data": {"nonce": os.urandom(8).hex()}})
+
+    def auth_wallet(self, payload):
+        self.send_json(
+            {"isEVMLoggedIn": True},
+            headers={"Set-Cookie": f"auth-token={os.urandom(8).hex()}; Path=/"},
+        )
+
+    def get_user(self, payload):
+        self.send_json({"_id": os.urandom(12).hex()})
+
+    def success(self, payload):
+        self.send_json({"isSuccess": True})
+
+    def claim_signature(self, payload):
+        if not self.logged_in():
+            self.send_json({"message": "SuperUser not logged in"}, status=401)
+            return
+
+        now = int(time.time())
+        params = {
+            "royaltyRecipient": "0x" + "11" * 20,
+            "currency": to_checksum_address("0x" + "ee" * 20),
+            "uri": "ipfs://voyager/0",
+            "uid": "0x" + os.urandom(32).hex(),
+            "validityStartTimestamp": now - 60,
+            "validityEndTimestamp": now + 3600,
+        }
+        self.send_json({"claimData": {"functionParams": [params, "0x" + "22" * 65]}})
+
+    def verify_task(self, payload):
+        with self.server.lock:
+            self.server.verified.setdefault(self.headers.get("Questuserid"), set()).add(
+                payload["taskId"]
+            )
+
+        self.send_json({"verified": True})
+
+    def fetch_journey(self, payload):
+        query = parse_qs(urlparse(self.path).query)
+        user_id = query.get("questUserId", [None])[0]
+
+        with self.server.lock:
+            verified = sorted(self.server.verified.get(user_id, ()))
+
+        self.send_json(
+            {
+                "isActive": True,
+                "xp": 100 * len(verified),
+                "events": [
+                    {"taskId": task_id, "isVerified": True} for task_id in verified
+                ],
+            }
+        )
+
+
+class IntractServer(FakeServer):
+    def __init__(self, **kwargs):
+        super().__init__(IntractHandler, **kwargs)
+        self.verified = {}
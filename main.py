@@ -1,16 +1,25 @@
+import argparse
 import random
-
-import questionary
-from questionary import Choice
+from contextlib import nullcontext
+from functools import partial
 
 import settings
 from modules.config import VOYAGER_0G, logger, tasks
-from modules.intract import Intract
-from modules.utils import random_sleep, sleep, write_to_csv
-from modules.wallet import Wallet
+from modules.engine import run_wallets
+from modules.keys import KeyFile, address_book
+from modules.metrics import metrics
+from modules.profiling import Profiler
+from modules.sinks import close_sinks, get_sink
+
+# web3, tls_client and questionary are imported by the actions that need them,
+# so a scripted check_balance never loads the Intract client or the prompt
+ACTIONS = ["mint", "check_balance", "send_token"]
 
 
 def get_action() -> str:
+    import questionary
+    from questionary import Choice
+
     choices = [
         Choice("Ming 0g Voyager NFT and claim tasks on Intract", "mint"),
         Choice("Check NFT balance", "check_balance"),
@@ -38,92 +47,228 @@ def get_action() -> str:
     return action
 
 
-def main():
-    with open("keys.txt", "r") as f:
-        keys = [row.strip() for row in f]
+def get_nft_balances(keys):
+    from modules.multicall import Multicall
+    from modules.rpc import get_web3
 
-    with open("proxies.txt") as file:
-        proxies = [f"http://{row.strip()}" for row in file]
+    web3 = get_web3("base")
+    addresses = address_book.resolve(keys)
 
-    if not proxies and settings.USE_PROXY:
-        logger.warning("No proxies found. Please add proxies to proxies.txt")
+    if settings.HOLDER_INDEX:
+        from modules.holders import HolderIndex
+
+        index = HolderIndex(
+            web3, "base", VOYAGER_0G, chunk_size=settings.LOGS_CHUNK_SIZE
+        )
+        try:
+            if index.sync(max_windows=settings.HOLDER_INDEX_MAX_WINDOWS):
+                return index.balances(addresses)
+        except Exception as error:
+            logger.warning(f"Holder index sync failed, using multicall: {error}")
+
+    multicall = Multicall(web3, batch_size=settings.MULTICALL_BATCH_SIZE)
+    return multicall.get_balances(VOYAGER_0G, addresses)
+
+
+def check_balance(keys, nft_balances=None):
+    if nft_balances is None:
+        balances = get_nft_balances(keys)
+    else:
+        balances = {
+            address: nft_balances.get(address, 0)
+            for address in address_book.resolve(keys)
+        }
+
+    sink = get_sink("balance.csv", headers=["address", "balance"])
+
+    for index, (address, balance) in enumerate(balances.items(), start=1):
+        logger.debug(f"[{index}/{len(balances)}] {address} | {balance}")
+        sink.write([address, balance])
+
+
+def mint(key, proxy, label, nft_balances):
+    from modules.intract import Intract
+    from modules.journey import JourneyProgress
+    from modules.state import state
+    from modules.utils import random_sleep, sleep
+
+    client = Intract(key, proxy, label, address=address_book.get(key))
+    minted = bool(state.get_mints(client.address))
+    pending_tasks = [
+        task for task in tasks if task["id"] not in state.verified_tasks(client.address)
+    ]
+
+    if minted and not pending_tasks and not settings.ALLOW_MULTIPLE_MINTS:
+        logger.info(f"{client.label} Already completed, skipping")
+        return
+
+    if not client.auth():
+        return
+
+    if minted and not settings.ALLOW_MULTIPLE_MINTS:
+        logger.warning(f"{client.label} Mint already recorded, skipping")
+    else:
+        balance = client.get_nft_balance(nft_balances)
+
+        if settings.ALLOW_MULTIPLE_MINTS or balance < 1:
+            claim_data = client.get_claim_data()
+
+            if claim_data and client.mint(claim_data):
+                state.record_mint(client.address, client.last_tx_hash)
+        else:
+            logger.warning(f"{label} This wallet already minted {balance} nft(s)")
+            state.record_mint(client.address)
+
+    if not client.get_user_id():
         return
 
-    if settings.SHUFFLE_WALLETS:
-        random.shuffle(keys)
+    journey = client.fetch_journey()
+    if not journey:
+        return
+
+    # The journey only plans this run, state.db records what verify_task confirmed
+    progress = JourneyProgress(journey)
+    pending_tasks = progress.pending(pending_tasks)
+    verified_any = False
+
+    for task in random.sample(pending_tasks, len(pending_tasks)):
+        if task.get("needs_identity") and progress.needs_identity(client.address):
+            client.set_primary_identity()
+            random_sleep(5, 10)
+
+        status = client.verify_task(task)
+        get_sink("results/tasks.jsonl").write(
+            {"address": client.address, "task": task["id"], "verified": status}
+        )
+
+        if status:
+            verified_any = True
+            state.record_task(client.address, task["id"])
+            random_sleep(5, 20)
+
+    # XP only changes when something was verified
+    if verified_any:
+        progress = JourneyProgress(client.fetch_journey())
+
+    state.record_xp(client.address, progress.xp)
+    sleep(*settings.SLEEP_BETWEEN_WALLETS)
 
-    action = get_action()
+
+def send_tokens(keys):
+    from modules.transfers import TransferPipeline
+
+    pipeline = TransferPipeline(chain="0g")
+    pipeline.run(
+        keys,
+        settings.SEND_VALUE_PERCENTAGE,
+        send_batch_size=settings.SEND_BATCH_SIZE,
+    )
+
+
+def get_jobs(action, keys, proxies, nft_balances):
+    total_keys = len(keys)
 
     for index, key in enumerate(keys, start=1):
-        total_keys = len(keys)
         label = f"[{index}/{total_keys}]"
-        status = None
 
-        try:
-            if action == "mint":
-                proxy = random.choice(proxies) if settings.USE_PROXY else None
-                client = Intract(key, proxy, label)
+        if action == "mint":
+            proxy = random.choice(proxies) if settings.USE_PROXY else None
+            job = partial(mint, key, proxy, label, nft_balances)
 
-                if not client.auth():
-                    return
+        yield label, job
 
-                balance = client.get_nft_balance()
 
-                if settings.ALLOW_MULTIPLE_MINTS or balance < 1:
-                    claim_data = client.get_claim_data()
+def run_action(action, keys, proxies, concurrency, nft_balances=None):
+    """`nft_balances` read beforehand (e.g. once for all shards) skips the scan"""
+    if action == "check_balance":
+        check_balance(keys, nft_balances)
 
-                    if claim_data:
-                        client.mint(claim_data)
-                else:
-                    logger.warning(
-                        f"{label} This wallet already minted {balance} nft(s)"
-                    )
+    if action == "send_token":
+        send_tokens(keys)
 
-                if not client.get_user_id():
-                    return
+    if action == "mint":
+        if nft_balances is None:
+            nft_balances = {}
+            try:
+                nft_balances = get_nft_balances(keys)
+            except Exception as error:
+                logger.warning(f"Multicall balance scan failed, falling back: {error}")
 
-                if not client.fetch_journey():
-                    return
+        jobs = get_jobs(action, keys, proxies, nft_balances)
+        run_wallets(jobs, concurrency=concurrency)
 
-                random.shuffle(tasks)
 
-                for task in tasks:
-                    if task["id"] == "67162a6fc0c9e039a629d39d":
-                        client.set_primary_identity()
-                        random_sleep(5, 10)
+def finish():
+    address_book.save()
+    close_sinks()
+    metrics.export("results")
+    logger.info("Request metrics written to results/metrics.json")
 
-                    status = client.verify_task(task)
-                    if status:
-                        random_sleep(5, 20)
 
-                client.fetch_journey()
-                sleep(*settings.SLEEP_BETWEEN_WALLETS)
+def parse_args():
+    parser = argparse.ArgumentParser(description="0G Voyager mint and Intract tasks")
+    parser.add_argument(
+        "action",
+        nargs="?",
+        choices=ACTIONS,
+        help="action to run, the interactive menu is shown when omitted",
+    )
+    parser.add_argument("--keys", default="keys.txt", help="private keys file")
+    parser.add_argument("--proxies", default="proxies.txt", help="proxies file")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.CONCURRENCY,
+        help="wallets processed at the same time in each shard",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=settings.SHARDS,
+        help="worker processes the keys are split between",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the selected action and write the results to profiles/",
+    )
+    return parser.parse_args()
 
-            if action == "check_balance":
-                client = Wallet(key, label, chain="base")
-                balance = client.get_balance(VOYAGER_0G)
 
-                logger.debug(f"{client.label} {balance}")
-                write_to_csv(
-                    path=f"balance.csv",
-                    headers=["address", "balance"],
-                    data=[client.address, balance],
-                )
+def main():
+    args = parse_args()
+    # modules.rpc sizes its connection pool and hedge threads from this on import
+    settings.CONCURRENCY = args.concurrency
+    keys = KeyFile(args.keys, shuffle=settings.SHUFFLE_WALLETS)
 
-            if action == "send_token":
-                client = Wallet(key, label, chain="0g")
-                status = client.send_native_token_to_a_rand_wallet(
-                    settings.SEND_VALUE_PERCENTAGE
-                )
+    with open(args.proxies) as file:
+        proxies = [f"http://{row.strip()}" for row in file]
 
-                if status and index < total_keys:
-                    sleep(*settings.SLEEP_BETWEEN_WALLETS)
+    if not proxies and settings.USE_PROXY:
+        logger.warning(f"No proxies found. Please add proxies to {args.proxies}")
+        return
 
-            if action == "quit":
-                quit()
+    action = args.action or get_action()
 
-        except Exception as error:
-            logger.error(f"{label} Error processing wallet: {error} \n")
+    if action == "quit":
+        quit()
+
+    if settings.METRICS_PORT:
+        metrics.serve(settings.METRICS_PORT)
+        logger.info(f"Metrics at http://127.0.0.1:{settings.METRICS_PORT}/metrics")
+
+    profiler = Profiler(action) if args.profile else nullcontext()
+
+    try:
+        with profiler:
+            if args.shards > 1:
+                from modules.shards import run_sharded
+
+                run_sharded(action, args.keys, proxies, args.shards, args.concurrency)
+            else:
+                run_action(action, keys, proxies, args.concurrency)
+    finally:
+        finish()
 
 
 if __name__ == "__main__":
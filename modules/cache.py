@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+
+from web3 import Web3
+
+import settings
+from modules.config import CHAIN_DATA
+
+_contracts = {}
+_chain_ids = {}
+_lock = threading.Lock()
+
+
+def get_chain_id(web3, chain):
+    if chain in _chain_ids:
+        return _chain_ids[chain]
+
+    chain_id = CHAIN_DATA[chain].get("chain_id") or web3.eth.chain_id
+    _chain_ids[chain] = chain_id
+
+    return chain_id
+
+
+def get_contract(web3, chain, address, abi):
+    # ABIs are module-level constants, so their identity is a stable cache key
+    key = (chain, Web3.to_checksum_address(address), id(abi))
+
+    with _lock:
+        if key not in _contracts:
+            _contracts[key] = web3.eth.contract(address=key[1], abi=abi)
+
+        return _contracts[key]
+
+
+class TokenMetadata:
+    """Immutable token facts (decimals, symbol, name), optionally kept on disk"""
+
+    def __init__(self, path="data/cache/tokens.json", persist=True):
+        self.path = path
+        self.persist = persist
+        self.lock = threading.Lock()
+        self.data = self.load()
+
+    def load(self):
+        if not self.persist or not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+
+        os.replace(tmp_path, self.path)
+
+    def key(self, chain, address):
+        return f"{chain}:{Web3.to_checksum_address(address)}"
+
+    def get(self, chain, address, field):
+        return self.data.get(self.key(chain, address), {}).get(field)
+
+    def set(self, chain, address, field, value):
+        with self.lock:
+            self.data.setdefault(self.key(chain, address), {})[field] = value
+
+            if self.persist:
+                self.save()
+
+    def get_or_fetch(self, chain, address, field, fetch):
+        value = self.get(chain, address, field)
+
+        if value is None:
+            value = fetch()
+            self.set(chain, address, field, value)
+
+        return value
+
+
+token_metadata = TokenMetadata(persist=settings.PERSIST_CACHE)
+
+
+class GasEstimates:
+    """Gas limits per calldata shape (chain, contract, selector, length), so
+    repeated calls of the same kind skip eth_estimateGas"""
+
+    def __init__(self, margin=1.2):
+        self.margin = margin
+        self.limits = {}
+        self.lock = threading.Lock()
+
+    def key(self, chain, tx):
+        data = tx["data"]
+        return chain, tx["to"].lower(), data[:10], len(data)
+
+    def get_or_estimate(self, web3, chain, tx):
+        key = self.key(chain, tx)
+        gas = self.limits.get(key)
+
+        if gas is None:
+            # Storage writes vary a little between wallets, hence the margin
+            gas = int(web3.eth.estimate_gas(tx) * self.margin)
+
+            with self.lock:
+                self.limits[key] = gas
+
+        return gas
+
+    def forget(self, chain, tx):
+        with self.lock:
+            self.limits.pop(self.key(chain, tx), None)
+
+
+gas_estimates = GasEstimates()
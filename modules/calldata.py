@@ -0,0 +1,29 @@
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+
+
+def type_string(arg):
+    if arg["type"].startswith("tuple"):
+        components = ",".join(type_string(component) for component in arg["components"])
+        return f"({components}){arg['type'][len('tuple'):]}"
+
+    return arg["type"]
+
+
+class FunctionEncoder:
+    """Calldata for one ABI function with the selector and argument layout
+    resolved once, skipping web3's per-call ABI lookup and validation"""
+
+    def __init__(self, abi, name):
+        entry = next(
+            item
+            for item in abi
+            if item.get("type") == "function" and item.get("name") == name
+        )
+        self.types = [type_string(arg) for arg in entry["inputs"]]
+        self.selector = function_signature_to_4byte_selector(
+            f"{name}({','.join(self.types)})"
+        )
+
+    def encode(self, *args):
+        return "0x" + (self.selector + encode(self.types, args)).hex()
@@ -2,7 +2,6 @@ import json
 from sys import stderr
 
 from loguru import logger
-from web3 import Web3
 
 logger.remove()
 logger.add(
@@ -10,21 +9,33 @@ logger.add(
     format="<white>{time:HH:mm:ss}</white> | <level>{message}</level>",
 )
 
+# "rpc" takes one URL or a list, requests go to the fastest healthy endpoint
 CHAIN_DATA = {
     "ethereum": {
-        "rpc": "https://rpc.ankr.com/eth",
+        "rpc": [
+            "https://rpc.ankr.com/eth",
+            "https://ethereum-rpc.publicnode.com",
+            "https://eth.llamarpc.com",
+        ],
         "explorer": "https://etherscan.io",
         "token": "ETH",
         "chain_id": 1,
     },
     "linea": {
-        "rpc": "https://linea-mainnet.blastapi.io/5728a575-0886-4d28-b073-57d4cc303d3b",
+        "rpc": [
+            "https://linea-mainnet.blastapi.io/5728a575-0886-4d28-b073-57d4cc303d3b",
+            "https://rpc.linea.build",
+        ],
         "explorer": "https://lineascan.build",
         "token": "ETH",
         "chain_id": 59144,
     },
     "base": {
-        "rpc": "https://mainnet.base.org",
+        "rpc": [
+            "https://mainnet.base.org",
+            "https://base-rpc.publicnode.com",
+            "https://base.llamarpc.com",
+        ],
         "explorer": "https://basescan.org",
         "token": "ETH",
         "chain_id": 8453,
@@ -37,9 +48,10 @@ CHAIN_DATA = {
     },
 }
 
-mainnet_client = Web3(Web3.HTTPProvider(CHAIN_DATA["ethereum"]["rpc"]))
+INTRACT_API = "https://gcp-api.intract.io/api/qv1"
 
 VOYAGER_0G = "0xF64B5E5D0aD587E2B8c796Cc07b108DD2f6C2288"
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
 
 tasks = [
     {"name": "Follow 0G on Twitter", "id": "6715da4fc0c9e039a626fbea"},
@@ -47,13 +59,25 @@ tasks = [
     {
         "name": "Mint and verify that you hold 0G Voyager NFT",
         "id": "67162a6fc0c9e039a629d39d",
+        "needs_identity": True,
     },
     {"name": "Retweet the campaign announcement", "id": "6715db33c0c9e039a626fd13"},
     {"name": "Check out the TonTon miniapp", "id": "6715db33c0c9e039a626fd14"},
 ]
 
-with open("data/abi/erc20.json") as f:
-    ERC20_ABI = json.load(f)
+ABI_FILES = {
+    "ERC20_ABI": "data/abi/erc20.json",
+    "VOYAGER_0G_ABI": "data/abi/voyager_0g.json",
+    "MULTICALL3_ABI": "data/abi/multicall3.json",
+}
+
+
+def __getattr__(name):
+    # ABIs are read on first use and then stay module globals
+    if name not in ABI_FILES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with open(ABI_FILES[name]) as f:
+        globals()[name] = json.load(f)
 
-with open("data/abi/voyager_0g.json") as f:
-    VOYAGER_0G_ABI = json.load(f)
+    return globals()[name]
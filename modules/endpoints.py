@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+MIN_SAMPLES = 20
+DEFAULT_DEADLINE = 1.0
+MIN_DEADLINE = 0.05
+FAILURES_TO_BENCH = 3
+BENCH_SECONDS = 30
+PROBE_RATE = 0.02
+
+
+class Endpoint:
+    """Rolling latency and error score of one RPC URL"""
+
+    def __init__(self, url):
+        self.url = url
+        self.host = urlparse(url).netloc
+        self.latency = None
+        self.samples = deque(maxlen=200)
+        self.failures = 0
+        self.benched_until = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self.lock:
+            if not ok:
+                self.failures += 1
+
+                if self.failures >= FAILURES_TO_BENCH:
+                    self.benched_until = time.monotonic() + BENCH_SECONDS
+                return
+
+            self.failures = 0
+            self.samples.append(seconds)
+            self.latency = (
+                seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+            )
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.benched_until
+
+    @property
+    def score(self):
+        # Endpoints without samples rank first so every URL gets measured
+        return (self.latency or 0.0) * (1 + self.failures)
+
+    def deadline(self, percentile=95):
+        """Time after which a read is worth duplicating on the next endpoint"""
+        with self.lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return DEFAULT_DEADLINE
+
+            samples = sorted(self.samples)
+
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return max(MIN_DEADLINE, samples[index])
+
+
+class EndpointPool:
+    def __init__(self, urls):
+        self.endpoints = [Endpoint(url) for url in urls]
+
+    def ranked(self):
+        """Healthy endpoints fastest first, benched ones only as a last resort"""
+        healthy = sorted(
+            (endpoint for endpoint in self.endpoints if endpoint.healthy),
+            key=lambda endpoint: endpoint.score,
+        )
+        benched = [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+
+        # Occasionally lead with another endpoint so a recovered node can win back
+        if len(healthy) > 1 and random.random() < PROBE_RATE:
+            probe = healthy.pop(random.randrange(1, len(healthy)))
+            healthy.insert(0, probe)
+
+        return healthy + benched
+
+    def scores(self):
+        return {
+            endpoint.url: {
+                "latency_ms": (
+                    round(endpoint.latency * 1000, 2)
+                    if endpoint.latency is not None
+                    else None
+                ),
+                "failures": endpoint.failures,
+                "healthy": endpoint.healthy,
+            }
+            for endpoint in self.endpoints
+        }
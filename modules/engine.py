@@ -0,0 +1,39 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.config import logger
+from modules.scheduler import scheduler
+
+
+def run_job(label, job):
+    scheduler.acquire_slot()
+
+    try:
+        return job()
+    except Exception as error:
+        logger.error(f"{label} Error processing wallet: {error} \n")
+    finally:
+        scheduler.release_slot()
+
+
+async def run_jobs(jobs, concurrency):
+    loop = asyncio.get_running_loop()
+    scheduler.set_slots(concurrency)
+
+    # Extra threads pick up free slots while other wallets are parked in a sleep
+    workers = concurrency * 2
+    jobs = iter(jobs)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        async def worker():
+            # Jobs are pulled lazily, so a streamed key file is never held in memory
+            for label, job in jobs:
+                await loop.run_in_executor(executor, run_job, label, job)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+def run_wallets(jobs, concurrency=1):
+    """Run (label, job) pairs with at most `concurrency` wallets working at once"""
+    asyncio.run(run_jobs(jobs, max(1, concurrency)))
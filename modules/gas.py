@@ -0,0 +1,86 @@
+import threading
+import time
+
+import settings
+from modules.config import logger
+from modules.rpc import get_web3
+
+
+class GasOracle:
+    """Background gas price feed shared by every wallet in the process,
+    only chains that were asked for are polled"""
+
+    def __init__(self, interval=12, ttl=60):
+        self.chains = set()
+        self.interval = interval
+        self.ttl = ttl
+        self.prices = {}
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            for chain in list(self.chains):
+                self.refresh(chain)
+
+            time.sleep(self.interval)
+
+    def refresh(self, chain):
+        try:
+            web3 = get_web3(chain)
+            gwei = web3.from_wei(web3.eth.gas_price, "gwei")
+        except Exception as error:
+            logger.error(f"Gas oracle | {chain}: {error}")
+            return
+
+        with self.condition:
+            self.prices[chain] = (gwei, time.monotonic())
+            self.condition.notify_all()
+
+    def cached(self, chain):
+        gwei, updated_at = self.prices.get(chain, (None, 0))
+
+        if time.monotonic() - updated_at > self.ttl:
+            return None
+
+        return gwei
+
+    def get(self, chain="ethereum"):
+        self.chains.add(chain)
+        self.start()
+        gwei = self.cached(chain)
+
+        if gwei is None:
+            self.refresh(chain)
+            gwei = self.cached(chain)
+
+        return gwei
+
+    def wait_below(self, max_gwei, chain="ethereum"):
+        gwei = self.get(chain)
+
+        if gwei is not None and gwei <= max_gwei:
+            return gwei
+
+        logger.info(f"Current gwei {gwei} > {max_gwei}")
+
+        with self.condition:
+            while True:
+                gwei = self.cached(chain)
+
+                if gwei is not None and gwei <= max_gwei:
+                    return gwei
+
+                self.condition.wait(timeout=self.interval)
+
+
+gas_oracle = GasOracle(
+    interval=settings.GAS_REFRESH_INTERVAL,
+    ttl=settings.GAS_PRICE_TTL,
+)
@@ -0,0 +1,193 @@
+import time
+
+import settings
+from modules.config import logger
+from modules.rpc import RpcBatch
+from modules.state import state
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ZERO_ADDRESS = "0x" + "00" * 20
+CONFIRMATIONS = 32
+MAX_RETRIES = 5
+# eth_getLogs answers meaning the window is too wide, any other error is retried as is
+RANGE_ERRORS = ("range",)
+RESULT_LIMIT_ERRORS = ("-32005", "limit", "too many")
+# get_code answers of nodes that no longer keep state for old blocks
+PRUNED_ERRORS = ("missing trie node", "pruned", "header not found", "not available")
+
+
+class HolderIndex:
+    """ERC-721 balances rebuilt from Transfer logs and kept in state.db.
+
+    The first sync scans from the contract's deploy block, later ones only
+    fetch blocks past the stored checkpoint.
+    """
+
+    def __init__(self, web3, chain, contract, chunk_size=10_000, batch_size=10):
+        self.web3 = web3
+        self.chain = chain
+        self.contract = web3.to_checksum_address(contract)
+        self.token = f"{chain}:{contract.lower()}"
+        self.max_chunk_size = chunk_size
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def find_deploy_block(self, head):
+        """First block with code at the contract address. Bounds are stored as the
+        search narrows, so an interrupted search resumes and a node without old
+        state falls back to the highest block known to have no code"""
+        low_key, high_key = f"{self.token}:no_code", f"{self.token}:code"
+        low = state.get_checkpoint(low_key)
+        low = 0 if low is None else low + 1
+        high = state.get_checkpoint(high_key)
+        high = head if high is None else high
+
+        while low < high:
+            middle = (low + high) // 2
+
+            try:
+                code = self.web3.eth.get_code(self.contract, middle)
+            except Exception as error:
+                if not any(text in str(error).lower() for text in PRUNED_ERRORS):
+                    raise
+
+                logger.warning(
+                    f"Holder index | No state for block {middle}, scanning from block "
+                    f"{low}. Set HOLDER_INDEX_START_BLOCK to skip the empty blocks"
+                )
+                return low
+
+            if code:
+                high = middle
+                state.set_checkpoint(high_key, high)
+            else:
+                low = middle + 1
+                state.set_checkpoint(low_key, middle)
+
+        return low
+
+    def start_block(self, head):
+        if settings.HOLDER_INDEX_START_BLOCK is not None:
+            return settings.HOLDER_INDEX_START_BLOCK
+
+        block = self.find_deploy_block(head)
+        logger.info(f"Holder index | Indexing {self.contract} from block {block}")
+        return block
+
+    def windows(self, start, end):
+        for _ in range(self.batch_size):
+            if start > end:
+                return
+
+            stop = min(end, start + self.chunk_size - 1)
+            yield start, stop
+            start = stop + 1
+
+    def apply_logs(self, logs, deltas):
+        for log in logs:
+            topics = log["topics"]
+
+            # ERC-20 Transfer shares the topic but has no indexed token id
+            if len(topics) != 4:
+                continue
+
+            sender = "0x" + topics[1][-40:].lower()
+            receiver = "0x" + topics[2][-40:].lower()
+
+            if sender != ZERO_ADDRESS:
+                deltas[sender] = deltas.get(sender, 0) - 1
+
+            if receiver != ZERO_ADDRESS:
+                deltas[receiver] = deltas.get(receiver, 0) + 1
+
+    def shrink(self, error):
+        """Halves the window for range and result-count errors, False for others"""
+        message = str(error).lower()
+
+        if self.chunk_size > 1 and any(text in message for text in RANGE_ERRORS):
+            # The node caps the block range, windows never need to grow past it
+            self.max_chunk_size = max(1, self.chunk_size // 2)
+        elif self.chunk_size == 1 or not any(
+            text in message for text in RESULT_LIMIT_ERRORS
+        ):
+            return False
+
+        self.chunk_size = max(1, self.chunk_size // 2)
+        logger.warning(
+            f"Holder index | Using {self.chunk_size}-block windows after: {error}"
+        )
+        return True
+
+    def sync(self, max_windows=None):
+        """Indexes up to the confirmed head. Returns False when `max_windows`
+        eth_getLogs windows were not enough, progress is kept for the next run"""
+        head = self.web3.eth.block_number - CONFIRMATIONS
+        checkpoint = state.get_checkpoint(self.token)
+
+        if checkpoint is None:
+            first_block = self.start_block(head)
+            state.apply_transfers(self.token, None, first_block - 1, {})
+            checkpoint = state.get_checkpoint(self.token)
+
+        failures = 0
+        fetched = 0
+
+        while checkpoint < head:
+            if max_windows is not None and fetched >= max_windows:
+                logger.info(
+                    f"Holder index | At block {checkpoint}/{head}, continuing next run"
+                )
+                return False
+
+            windows = list(self.windows(checkpoint + 1, head))
+            fetched += len(windows)
+            batch = RpcBatch(self.web3)
+
+            for start, stop in windows:
+                batch.add(
+                    "eth_getLogs",
+                    [
+                        {
+                            "address": self.contract,
+                            "fromBlock": hex(start),
+                            "toBlock": hex(stop),
+                            "topics": [TRANSFER_TOPIC],
+                        }
+                    ],
+                )
+
+            deltas = {}
+            synced_to = checkpoint
+
+            for (_, stop), logs in zip(windows, batch.execute(raise_errors=False)):
+                if isinstance(logs, Exception):
+                    if not self.shrink(logs):
+                        # Transient, the same windows are sent again after a pause
+                        failures += 1
+
+                        if failures > MAX_RETRIES:
+                            raise logs
+
+                        logger.debug(f"Holder index | Retrying windows after: {logs}")
+                        time.sleep(0.5 * 2**failures)
+                    break
+
+                self.apply_logs(logs, deltas)
+                synced_to = stop
+            else:
+                failures = 0
+                self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+
+            if synced_to > checkpoint:
+                failures = 0
+
+                if not state.apply_transfers(self.token, checkpoint, synced_to, deltas):
+                    logger.debug("Holder index | Another process synced these blocks")
+
+            checkpoint = state.get_checkpoint(self.token)
+            logger.debug(f"Holder index | Synced to block {checkpoint}/{head}")
+
+        return True
+
+    def balances(self, addresses):
+        return state.get_holder_balances(self.token, addresses)
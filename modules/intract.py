@@ -1,21 +1,31 @@
 import os
 import random
 import time
+from urllib.parse import urlparse
 
 from eth_account.messages import encode_defunct
 from tls_client import Session
 
 import settings
-from modules.config import VOYAGER_0G, VOYAGER_0G_ABI, logger
-from modules.utils import check_gas
+from modules.cache import gas_estimates, token_metadata
+from modules.calldata import FunctionEncoder
+from modules.config import INTRACT_API, VOYAGER_0G, VOYAGER_0G_ABI, logger
+from modules.metrics import metrics
+from modules.nonce import nonce_manager
+from modules.ratelimit import limiter
+from modules.state import state
+from modules.utils import check_gas, random_sleep
 from modules.wallet import Wallet
 
+MINT_WITH_SIGNATURE = FunctionEncoder(VOYAGER_0G_ABI, "mintWithSignature")
+
 
 class Intract(Wallet):
-    def __init__(self, private_key, proxy, label):
-        super().__init__(private_key, label)
+    def __init__(self, private_key, proxy, label, address=None):
+        super().__init__(private_key, label, address=address)
         self.label += " Intract |"
         self.session = self.get_new_session(proxy)
+        self.session_restored = False
         self.contract = self.get_contract(VOYAGER_0G, VOYAGER_0G_ABI)
 
         self.project_id = "66c904e84af02b13b2cdd831"
@@ -33,15 +43,92 @@ class Intract(Wallet):
 
         return session
 
+    def restore_session(self):
+        cached = state.get_session(self.address)
+
+        if not cached:
+            return False
+
+        cookies, quest_user_id = cached
+
+        for cookie in cookies:
+            self.session.cookies.set(**cookie)
+
+        if quest_user_id:
+            self.session.headers.update({"Questuserid": quest_user_id})
+
+        self.session_restored = True
+        return True
+
+    def save_session(self):
+        cookies = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": cookie.expires,
+            }
+            for cookie in self.session.cookies
+        ]
+        expiries = [cookie["expires"] for cookie in cookies if cookie["expires"]]
+        expires_at = min(expiries + [time.time() + settings.SESSION_TTL])
+
+        state.save_session(
+            self.address, cookies, self.session.headers.get("Questuserid"), expires_at
+        )
+
+    def drop_session(self):
+        state.drop_session(self.address)
+        self.session.cookies.clear()
+        self.session.headers.pop("Questuserid", None)
+        self.session_restored = False
+
+    def is_unauthorized(self, response):
+        return response.status_code == 401 or "SuperUser not logged in" in (
+            response.text or ""
+        )
+
+    def send(self, method, url, **kwargs):
+        parsed = urlparse(url)
+        name = parsed.path.removeprefix(urlparse(INTRACT_API).path)
+
+        def attempt():
+            with metrics.track(parsed.netloc, name) as call:
+                response = getattr(self.session, method)(url, **kwargs)
+                call.status = response.status_code
+
+            return response
+
+        return limiter.call(parsed.netloc, attempt)
+
+    def request(self, method, url, **kwargs):
+        response = self.send(method, url, **kwargs)
+
+        if self.session_restored and self.is_unauthorized(response):
+            logger.warning(f"{self.label} Cached session rejected, signing in again")
+            had_user_id = bool(self.session.headers.get("Questuserid"))
+
+            self.drop_session()
+            self.auth(force=True)
+
+            if had_user_id:
+                self.get_user_id()
+
+            metrics.retry(urlparse(url).netloc, "reauth")
+            response = self.send(method, url, **kwargs)
+
+        return response
+
     def get_nonce(self):
-        url = "https://gcp-api.intract.io/api/qv1/auth/generate-nonce"
+        url = f"{INTRACT_API}/auth/generate-nonce"
         payload = {
             "namespaceTag": "EVM::EVM",
             "walletAddress": self.address,
             "connector": "METAMASK::EOA",
         }
 
-        resp = self.session.post(url, json=payload)
+        resp = self.send("post", url, json=payload)
         return resp.json()["data"]["nonce"]
 
     def sign_message(self, nonce):
@@ -52,11 +139,15 @@ class Intract(Wallet):
         )
         return signed_message.signature.hex()
 
-    def auth(self):
+    def auth(self, force=False):
+        if not force and self.restore_session():
+            logger.debug(f"{self.label} Reusing cached session")
+            return True
+
         nonce = self.get_nonce()
         signature = self.sign_message(nonce)
 
-        url = "https://gcp-api.intract.io/api/qv1/auth/wallet"
+        url = f"{INTRACT_API}/auth/wallet"
         payload = {
             "namespaceTag": "EVM::EVM",
             "userAddress": self.address,
@@ -66,19 +157,20 @@ class Intract(Wallet):
             "fingerprintId": os.urandom(16).hex(),
         }
 
-        response = self.session.post(url, json=payload)
+        response = self.send("post", url, json=payload)
         data = response.json()
 
         if not data.get("isEVMLoggedIn"):
             raise Exception(f"Authorization failed: {data}")
 
         logger.debug(f"{self.label} Authorization successful")
-        time.sleep(random.randint(*settings.SLEEP_BETWEEN_ACTIONS))
+        self.save_session()
+        random_sleep(*settings.SLEEP_BETWEEN_ACTIONS)
 
         return True
 
     def get_claim_data(self):
-        url = "https://gcp-api.intract.io/api/qv1/compass-nft/claim-signature"
+        url = f"{INTRACT_API}/compass-nft/claim-signature"
         params = {
             "isGemsFreeClaim": False,
             "walletAddress": self.address,
@@ -87,7 +179,7 @@ class Intract(Wallet):
             "namespaceTag": "EVM::EVM",
         }
 
-        response = self.session.get(url, params=params)
+        response = self.request("get", url, params=params)
         data = response.json()
 
         if data.get("message") == "SuperUser not logged in":
@@ -96,7 +188,12 @@ class Intract(Wallet):
 
         return data["claimData"]["functionParams"]
 
-    def get_nft_balance(self):
+    def get_nft_balance(self, balances=None):
+        # A prescanned 0 can be a minute old (the holder index lags by
+        # CONFIRMATIONS), so only a positive balance skips the live check
+        if balances and balances.get(self.address):
+            return balances[self.address]
+
         balance = self.contract.functions.balanceOf(self.address).call()
         return balance
 
@@ -104,10 +201,12 @@ class Intract(Wallet):
     def mint(self, claim_data):
         """Function: mintWithSignature((address,address,uint256,address,string,uint256,address,uint128,uint128,bytes32), bytes)"""
 
-        name = self.contract.functions.name().call()
+        name = token_metadata.get_or_fetch(
+            self.chain, VOYAGER_0G, "name", self.contract.functions.name().call
+        )
 
         func_params = claim_data[0]
-        signature = claim_data[1]
+        signature = self.web3.to_bytes(hexstr=claim_data[1])
 
         royalty_addr = func_params["royaltyRecipient"]
         currency = func_params["currency"]
@@ -132,29 +231,52 @@ class Intract(Wallet):
         )
         # fmt: on
 
-        contract_tx = self.contract.functions.mintWithSignature(
-            req, signature
-        ).build_transaction(self.get_tx_data())
+        tx_data = self.get_tx_data()
+
+        try:
+            contract_tx = {
+                **tx_data,
+                **self.get_fees(),
+                "to": self.contract.address,
+                "data": MINT_WITH_SIGNATURE.encode(req, signature),
+            }
+            contract_tx["gas"] = gas_estimates.get_or_estimate(
+                self.web3, self.chain, contract_tx
+            )
+        except Exception:
+            nonce_manager.release(self.chain, self.address, tx_data["nonce"])
+            raise
 
-        return self.send_tx(
+        status = self.send_tx(
             contract_tx,
             tx_label=f"{self.label} Mint {name}",
         )
 
+        if not status:
+            # The cached limit may be what ran out, estimate again next time
+            gas_estimates.forget(self.chain, contract_tx)
+
+        return status
+
     def get_user_id(self) -> str:
-        url = f"https://gcp-api.intract.io/api/qv1/auth/get-user?projectId={self.project_id}"
-        response = self.session.get(url)
+        quest_user_id = self.session.headers.get("Questuserid")
+        if quest_user_id:
+            return quest_user_id
+
+        url = f"{INTRACT_API}/auth/get-user?projectId={self.project_id}"
+        response = self.request("get", url)
         quest_user_id = response.json()["_id"]
 
         self.session.headers.update({"Questuserid": quest_user_id})
+        self.save_session()
         return quest_user_id
 
     def set_primary_identity(self):
-        url = "https://gcp-api.intract.io/api/qv1/auth/set-primary-task-identity"
+        url = f"{INTRACT_API}/auth/set-primary-task-identity"
 
         payload = {"identity": self.address, "namespaceTag": "EVM::EVM"}
 
-        response = self.session.post(url, json=payload)
+        response = self.request("post", url, json=payload)
         data = response.json()
 
         if data.get("isSuccess"):
@@ -163,7 +285,7 @@ class Intract(Wallet):
         return True if data.get("isSuccess") else False
 
     def verify_task(self, task):
-        url = "https://gcp-api.intract.io/api/qv1/task/verify-v2"
+        url = f"{INTRACT_API}/task/verify-v2"
         payload = {
             "campaignId": self.campaign_id,
             "taskId": task["id"],
@@ -171,7 +293,7 @@ class Intract(Wallet):
             "userVerificationData": {},
         }
 
-        response = self.session.post(url, json=payload)
+        response = self.request("post", url, json=payload)
         data = response.json()
 
         if data.get("verified"):
@@ -182,7 +304,7 @@ class Intract(Wallet):
         return True if data.get("verified") else False
 
     def fetch_journey(self):
-        url = "https://gcp-api.intract.io/api/qv1/journey/fetch"
+        url = f"{INTRACT_API}/journey/fetch"
         params = {
             "campaignId": self.campaign_id,
             "channelCode": "DEFAULT",
@@ -206,13 +328,13 @@ class Intract(Wallet):
                 }
             )
 
-        resp = self.session.get(url, params=params)
+        resp = self.request("get", url, params=params)
         data = resp.json()
 
         if data.get("isActive") != True:
             logger.error(f"Activate journey error: {resp.text}")
 
         logger.debug(f"{self.label} Collected XP: {data.get('xp')}")
-        time.sleep(random.randint(5, 10))
+        random_sleep(5, 10)
 
         return data
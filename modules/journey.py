@@ -0,0 +1,82 @@
+TASK_ID_KEYS = ("taskId", "task_id")
+VERIFIED_FLAGS = ("isVerified", "verified", "isCompleted", "completed")
+STATUS_KEYS = ("status", "verificationStatus", "taskStatus")
+VERIFIED_STATUSES = {"VERIFIED", "COMPLETED", "SUCCESS", "CLAIMED", "DONE"}
+IDENTITY_KEYS = ("primaryTaskIdentity", "primaryIdentity", "taskIdentity")
+MAX_DEPTH = 6
+
+
+class JourneyProgress:
+    """Per-task status read from a /journey/fetch response.
+
+    The response is not documented, so it is searched rather than parsed:
+    any object with a task id ("taskId", "task_id" or a nested "task"
+    object's "_id") and a verification flag ("isVerified", "verified",
+    "isCompleted", or a status string such as "VERIFIED") counts as task
+    progress, at any depth. The wallet's primary identity is read from
+    "primaryTaskIdentity"-like keys, either a plain address or an object
+    with "identity". Whatever cannot be read counts as not done, so an
+    unknown shape falls back to verifying every task. A guess can be wrong,
+    so the result only plans the current run and is never persisted.
+    """
+
+    def __init__(self, data):
+        self.data = data or {}
+        self.xp = self.data.get("xp")
+        self.verified = set()
+        self.identity = None
+        self.walk(self.data, 0)
+
+    def walk(self, node, depth):
+        if depth > MAX_DEPTH:
+            return
+
+        if isinstance(node, list):
+            for item in node:
+                self.walk(item, depth + 1)
+            return
+
+        if not isinstance(node, dict):
+            return
+
+        task_id = self.task_id(node)
+        if task_id and self.is_verified(node):
+            self.verified.add(task_id)
+
+        for key in IDENTITY_KEYS:
+            identity = node.get(key)
+
+            if isinstance(identity, dict):
+                identity = identity.get("identity")
+
+            if isinstance(identity, str) and self.identity is None:
+                self.identity = identity
+
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                self.walk(value, depth + 1)
+
+    def task_id(self, node):
+        for key in TASK_ID_KEYS:
+            if isinstance(node.get(key), str):
+                return node[key]
+
+        task = node.get("task")
+        if isinstance(task, dict) and isinstance(task.get("_id"), str):
+            return task["_id"]
+
+        return None
+
+    def is_verified(self, node):
+        if any(node.get(flag) is True for flag in VERIFIED_FLAGS):
+            return True
+
+        return any(
+            str(node.get(key, "")).upper() in VERIFIED_STATUSES for key in STATUS_KEYS
+        )
+
+    def needs_identity(self, address):
+        return self.identity is None or self.identity.lower() != address.lower()
+
+    def pending(self, tasks):
+        return [task for task in tasks if task["id"] not in self.verified]
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import settings
+from modules.config import logger
+
+
+def iter_keys(path="keys.txt", shard=None):
+    """Keys in file order, `shard=(index, count)` keeps every count-th key"""
+    with open(path) as f:
+        keys = (row.strip() for row in f)
+
+        for position, key in enumerate(key for key in keys if key):
+            if shard is None or position % shard[1] == shard[0]:
+                yield key
+
+
+def count_keys(path="keys.txt", shard=None):
+    return sum(1 for _ in iter_keys(path, shard))
+
+
+class KeyFile:
+    """Re-iterable view of keys.txt, shuffling needs the whole file in memory"""
+
+    def __init__(self, path="keys.txt", shuffle=False, shard=None):
+        self.path = path
+        self.shard = shard
+        self.shuffled = None
+
+        if shuffle:
+            self.shuffled = list(iter_keys(path, shard))
+            random.shuffle(self.shuffled)
+
+    def __iter__(self):
+        if self.shuffled is not None:
+            return iter(self.shuffled)
+
+        return iter_keys(self.path, self.shard)
+
+    def __len__(self):
+        if self.shuffled is not None:
+            return len(self.shuffled)
+
+        return count_keys(self.path, self.shard)
+
+
+def fingerprint(key):
+    key = key.lower().removeprefix("0x")
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def derive_address(key):
+    # Imported here so runs served from the address cache skip eth_account
+    from eth_account import Account
+
+    return Account.from_key(key).address
+
+
+class AddressBook:
+    """Key fingerprint -> address mapping, derived in a process pool and kept on disk"""
+
+    def __init__(self, path="data/cache/addresses.json", workers=None):
+        self.path = path
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.addresses = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Shard processes save concurrently, each through its own temp file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "w") as f:
+            json.dump(self.addresses, f)
+
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        address = self.addresses.get(fingerprint(key))
+
+        if address is None:
+            address = derive_address(key)
+
+            with self.lock:
+                self.addresses[fingerprint(key)] = address
+
+        return address
+
+    def resolve(self, keys, chunksize=256):
+        """Addresses for an iterable of keys, deriving only the ones not cached yet"""
+        keys = list(keys)
+        missing = [key for key in keys if fingerprint(key) not in self.addresses]
+
+        if missing:
+            logger.info(f"Deriving {len(missing)} addresses")
+
+            if len(missing) < chunksize:
+                derived = map(derive_address, missing)
+            else:
+                executor = ProcessPoolExecutor(max_workers=self.workers)
+                with executor:
+                    derived = list(
+                        executor.map(derive_address, missing, chunksize=chunksize)
+                    )
+
+            with self.lock:
+                for key, address in zip(missing, derived):
+                    self.addresses[fingerprint(key)] = address
+
+                self.save()
+
+        return [self.addresses[fingerprint(key)] for key in keys]
+
+
+address_book = AddressBook(workers=settings.KEY_DERIVATION_WORKERS)
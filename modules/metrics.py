@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float("inf"))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+
+    def merge(self, other):
+        self.count += other.count
+        self.sum += other.sum
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation, None past the last bound"""
+        target = q * self.count
+
+        for bound, total in self.cumulative():
+            if total >= target:
+                return None if bound == float("inf") else bound
+
+
+class Metrics:
+    """Latency histograms, status codes and retries per (endpoint, call)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(Histogram)
+        self.statuses = defaultdict(int)
+        self.retries = defaultdict(int)
+
+    def observe(self, endpoint, name, seconds, status):
+        with self.lock:
+            self.latency[(endpoint, name)].observe(seconds)
+            self.statuses[(endpoint, name, str(status))] += 1
+
+    def retry(self, endpoint, name, count=1):
+        if count:
+            with self.lock:
+                self.retries[(endpoint, name)] += count
+
+    @contextmanager
+    def track(self, endpoint, name):
+        """Times the block, callers may set `call.status` to override the default 200"""
+        call = type("Call", (), {"status": 200})()
+        started = time.perf_counter()
+
+        try:
+            yield call
+        except Exception as error:
+            response = getattr(error, "response", None)
+            call.status = getattr(response, "status_code", None) or type(error).__name__
+            raise
+        finally:
+            self.observe(endpoint, name, time.perf_counter() - started, call.status)
+
+    def state(self):
+        """Picklable copy of the raw counters, see `merge`"""
+        with self.lock:
+            return dict(self.latency), dict(self.statuses), dict(self.retries)
+
+    def merge(self, state):
+        """Adds counters collected by another process (shard workers)"""
+        latency, statuses, retries = state
+
+        with self.lock:
+            for key, histogram in latency.items():
+                self.latency[key].merge(histogram)
+
+            for key, count in statuses.items():
+                self.statuses[key] += count
+
+            for key, count in retries.items():
+                self.retries[key] += count
+
+    def snapshot(self):
+        with self.lock:
+            calls = {}
+
+            for (endpoint, name), histogram in self.latency.items():
+                calls.setdefault(endpoint, {})[name] = {
+                    "count": histogram.count,
+                    "avg_ms": round(histogram.sum / histogram.count * 1000, 2),
+                    "p50_le_s": histogram.quantile(0.5),
+                    "p99_le_s": histogram.quantile(0.99),
+                    "retries": self.retries.get((endpoint, name), 0),
+                    "statuses": {},
+                }
+
+            for (endpoint, name, status), count in self.statuses.items():
+                calls[endpoint][name]["statuses"][status] = count
+
+            # Transport-level retries have no latency entry of their own
+            for (endpoint, name), count in self.retries.items():
+                calls.setdefault(endpoint, {}).setdefault(name, {"retries": count})
+
+            return calls
+
+    def to_prometheus(self):
+        lines = [
+            "# TYPE voyager_request_seconds histogram",
+        ]
+
+        with self.lock:
+            for (endpoint, name), histogram in sorted(self.latency.items()):
+                labels = f'endpoint="{endpoint}",call="{name}"'
+
+                for bound, total in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else bound
+                    lines.append(
+                        f'voyager_request_seconds_bucket{{{labels},le="{le}"}} {total}'
+                    )
+
+                lines.append(f"voyager_request_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(
+                    f"voyager_request_seconds_count{{{labels}}} {histogram.count}"
+                )
+
+            lines.append("# TYPE voyager_requests_total counter")
+            for (endpoint, name, status), count in sorted(self.statuses.items()):
+                lines.append(
+                    f'voyager_requests_total{{endpoint="{endpoint}",call="{name}",status="{status}"}} {count}'
+                )
+
+            lines.append("# TYPE voyager_retries_total counter")
+            for (endpoint, name), count in sorted(self.retries.items()):
+                lines.append(
+                    f'voyager_retries_total{{endpoint="{endpoint}",call="{name}"}} {count}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory="results"):
+        os.makedirs(directory, exist_ok=True)
+
+        with open(os.path.join(directory, "metrics.json"), "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+        with open(os.path.join(directory, "metrics.prom"), "w") as f:
+            f.write(self.to_prometheus())
+
+    def serve(self, port):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+
+metrics = Metrics()
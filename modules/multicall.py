@@ -0,0 +1,45 @@
+from eth_abi import decode
+from web3 import Web3
+
+from modules.config import ERC20_ABI, MULTICALL3, MULTICALL3_ABI, logger
+
+
+class Multicall:
+    def __init__(self, web3, batch_size=500):
+        self.web3 = web3
+        self.batch_size = batch_size
+        self.contract = web3.eth.contract(
+            address=Web3.to_checksum_address(MULTICALL3), abi=MULTICALL3_ABI
+        )
+
+    def aggregate(self, calls):
+        """Run (target, calldata) pairs in chunks, returns raw return data or None per call"""
+        results = []
+
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start : start + self.batch_size]
+            payload = [(target, True, data) for target, data in chunk]
+
+            response = self.contract.functions.aggregate3(payload).call()
+            results.extend(data if success else None for success, data in response)
+
+            logger.debug(
+                f"Multicall | {start + len(chunk)}/{len(calls)} calls aggregated"
+            )
+
+        return results
+
+    def get_balances(self, token_addr, addresses):
+        token = self.web3.eth.contract(
+            address=Web3.to_checksum_address(token_addr), abi=ERC20_ABI
+        )
+        calls = [
+            (token.address, token.encodeABI(fn_name="balanceOf", args=[address]))
+            for address in addresses
+        ]
+
+        balances = {}
+        for address, data in zip(addresses, self.aggregate(calls)):
+            balances[address] = decode(["uint256"], data)[0] if data else None
+
+        return balances
@@ -0,0 +1,84 @@
+import threading
+from collections import defaultdict
+
+
+class NonceManager:
+    """Hands out nonces locally after one pending-count fetch per address.
+    Released nonces below the newest one are handed out again first, since
+    the nonces in flight after them cannot be mined until the gap is filled"""
+
+    def __init__(self):
+        self.next_nonce = {}
+        self.in_flight = defaultdict(set)
+        self.gaps = defaultdict(set)
+        self.lock = threading.RLock()
+
+    def is_synced(self, chain, address):
+        return (chain, address) in self.next_nonce
+
+    def sync(self, chain, address, pending_count):
+        with self.lock:
+            key = (chain, address)
+            self.next_nonce[key] = max(self.next_nonce.get(key, 0), pending_count)
+
+    def allocate(self, web3, chain, address):
+        with self.lock:
+            key = (chain, address)
+
+            if key not in self.next_nonce:
+                self.sync(
+                    chain, address, web3.eth.get_transaction_count(address, "pending")
+                )
+
+            if self.gaps[key]:
+                nonce = min(self.gaps[key])
+                self.gaps[key].remove(nonce)
+            else:
+                nonce = self.next_nonce[key]
+                self.next_nonce[key] += 1
+
+            self.in_flight[key].add(nonce)
+
+            return nonce
+
+    def confirm(self, chain, address, nonce):
+        with self.lock:
+            self.in_flight[(chain, address)].discard(nonce)
+
+    def release(self, chain, address, nonce):
+        """Give back a nonce that never reached the node"""
+        with self.lock:
+            key = (chain, address)
+            self.in_flight[key].discard(nonce)
+
+            if self.next_nonce.get(key) == nonce + 1:
+                self.next_nonce[key] = nonce
+
+                while self.next_nonce[key] - 1 in self.gaps[key]:
+                    self.next_nonce[key] -= 1
+                    self.gaps[key].remove(self.next_nonce[key])
+            elif self.in_flight[key]:
+                self.gaps[key].add(nonce)
+            else:
+                # Nothing local left to protect, let the node say where it stands
+                self.reset(chain, address)
+
+    def abandon(self, chain, address, nonce):
+        """Forget a sent nonce with an unknown outcome, the pending count is
+        re-read once nothing else of the address is in flight"""
+        with self.lock:
+            key = (chain, address)
+            self.in_flight[key].discard(nonce)
+
+            if not self.in_flight[key]:
+                self.reset(chain, address)
+
+    def reset(self, chain, address):
+        """Forget local state, the next allocation re-reads the pending count"""
+        with self.lock:
+            self.next_nonce.pop((chain, address), None)
+            self.in_flight.pop((chain, address), None)
+            self.gaps.pop((chain, address), None)
+
+
+nonce_manager = NonceManager()
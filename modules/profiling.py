@@ -0,0 +1,209 @@
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from modules.config import logger
+
+SLEEP_FUNCTIONS = {"sleep", "wait", "acquire", "join"}
+NETWORK_FUNCTIONS = {"recv", "recv_into", "read", "write", "send", "sendall", "poll"}
+NETWORK_FUNCTIONS |= {"select", "connect", "getaddrinfo", "do_handshake"}
+# Only these builtins do network I/O, "read"/"write" of _io files are disk and count as cpu
+NETWORK_OWNERS = ("_socket.", "_ssl.", "select.")
+NETWORK_MODULES = (
+    "/socket.py",
+    "/ssl.py",
+    "/tls_client/",
+    "/http/client.py",
+    "/urllib3/",
+)
+
+
+class _Snapshot:
+    """Lets pstats load a profiler that belongs to another thread"""
+
+    def __init__(self, profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self):
+        pass
+
+
+class Profiler:
+    """cProfile for every thread plus a stack sampler for flamegraphs.
+
+    Writes <action>.prof (pstats), <action>.collapsed (flamegraph.pl /
+    speedscope input) and <action>.summary.txt with time split into sleeping,
+    network I/O and CPU work per package.
+    """
+
+    def __init__(self, action, directory="profiles", interval=0.005):
+        self.action = action
+        self.directory = directory
+        self.interval = interval
+        self.profiles = []
+        self.sampled_threads = 0
+        self.samples = Counter()
+        self.lock = threading.Lock()
+        self.running = False
+
+    def __enter__(self):
+        self.running = True
+        self.started = time.perf_counter()
+
+        # Every thread started from now on gets its own cProfile instance
+        threading.setprofile(self.start_thread_profile)
+        self.start_thread_profile()
+
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        threading.setprofile(None)
+        self.main_profile.disable()
+        self.sampler.join()
+        self.write(time.perf_counter() - self.started)
+
+    def start_thread_profile(self, *args):
+        profile = cProfile.Profile()
+
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile at a time, the main thread keeps
+            # it and this thread only shows up in the sampled stacks
+            sys.setprofile(None)
+
+            with self.lock:
+                self.sampled_threads += 1
+            return
+
+        with self.lock:
+            self.profiles.append(profile)
+
+        if threading.current_thread() is threading.main_thread():
+            self.main_profile = profile
+
+    def sample(self):
+        own_id = threading.get_ident()
+        names = {}
+
+        while self.running:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)})"
+                    )
+                    frame = frame.f_back
+
+                stack.append(names.get(thread_id, "thread"))
+                self.samples[";".join(reversed(stack))] += 1
+
+            time.sleep(self.interval)
+
+    def classify(self, filename, name):
+        # Builtins show up as "<built-in method time.sleep>" or
+        # "<method 'recv_into' of '_socket.socket' objects>" with filename "~"
+        match = re.match(
+            r"<built-in method ([\w.]+)|<method '(\w+)' of '([\w.]+)'", name
+        )
+        if match and match.group(1):
+            owner, _, short = match.group(1).rpartition(".")
+        elif match:
+            short, owner = match.group(2), match.group(3)
+        else:
+            owner, short = "", name
+
+        if filename == "~" and short in SLEEP_FUNCTIONS:
+            return "sleep"
+
+        if (
+            filename == "~"
+            and short in NETWORK_FUNCTIONS
+            and (owner + ".").startswith(NETWORK_OWNERS)
+        ):
+            return "network"
+
+        if any(module in filename.replace("\\", "/") for module in NETWORK_MODULES):
+            return "network"
+
+        return "cpu"
+
+    def package(self, filename):
+        if filename == "~":
+            return "builtins"
+
+        parts = filename.replace("\\", "/").split("/")
+
+        if "site-packages" in parts:
+            return parts[parts.index("site-packages") + 1]
+
+        return parts[-2] if len(parts) > 1 else filename
+
+    def write(self, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.action)
+
+        with self.lock:
+            stats = pstats.Stats(_Snapshot(self.profiles[0]))
+            for profile in self.profiles[1:]:
+                stats.add(_Snapshot(profile))
+
+        stats.dump_stats(f"{base}.prof")
+
+        with open(f"{base}.collapsed", "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        categories = Counter()
+        cpu_packages = Counter()
+
+        for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items():
+            category = self.classify(filename, name)
+            categories[category] += tottime
+
+            if category == "cpu":
+                cpu_packages[self.package(filename)] += tottime
+
+        lines = [
+            f"action: {self.action}",
+            f"wall time: {elapsed:.2f}s across {len(self.profiles)} threads",
+        ]
+        if self.sampled_threads:
+            lines.append(
+                f"{self.sampled_threads} more threads only in {self.action}.collapsed, "
+                "this Python runs one cProfile at a time"
+            )
+        lines += [
+            "",
+            "thread time by category:",
+        ]
+        lines += [
+            f"  {name:<8} {seconds:10.2f}s"
+            for name, seconds in categories.most_common()
+        ]
+        lines += ["", "cpu time by package:"]
+        lines += [
+            f"  {name:<24} {seconds:10.3f}s"
+            for name, seconds in cpu_packages.most_common(15)
+        ]
+
+        with open(f"{base}.summary.txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        logger.info(f"Profile written to {base}.prof, {base}.collapsed")
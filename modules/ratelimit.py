@@ -0,0 +1,135 @@
+import threading
+import time
+
+import settings
+from modules.metrics import metrics
+
+THROTTLED = {429, 503}
+MIN_RATE = 0.5
+DECREASE = 0.7
+
+
+class TokenBucket:
+    """Request budget for one host with an AIMD refill rate.
+
+    Every fast answer adds to the rate (doubling per second of traffic until
+    the first throttle, then about +1 request/s per second), a 429/503 or an
+    answer slower than `slow_response` cuts it by DECREASE.
+    """
+
+    def __init__(self, rate, max_rate, slow_response):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.slow_response = slow_response
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.slow_start = True
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.refill(now)
+                wait = self.paused_until - now
+
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+
+                    wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def observe(self, status, seconds, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+
+            if status in THROTTLED or seconds > self.slow_response:
+                # Requests in flight fail together, cut once per second not once per reply
+                if now - self.decreased_at >= 1:
+                    self.rate = max(MIN_RATE, self.rate * DECREASE)
+                    self.tokens = min(self.tokens, 0.0)
+                    self.decreased_at = now
+                    self.slow_start = False
+
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+
+            elif status is not None:
+                step = 1.0 if self.slow_start else 1.0 / self.rate
+                self.rate = min(self.max_rate, self.rate + step)
+
+
+class RateLimiter:
+    def __init__(self, rate=10, max_rate=200, slow_response=5, retries=5):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.slow_response = slow_response
+        self.retries = retries
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(
+                    self.rate, self.max_rate, self.slow_response
+                )
+
+            return self.buckets[host]
+
+    def retry_after(self, response):
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def call(self, host, send):
+        """Run `send()` inside the host budget, throttled answers are retried
+        once the bucket has slowed down"""
+        bucket = self.bucket(host)
+
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            started = time.monotonic()
+
+            try:
+                response = send()
+            except Exception:
+                bucket.observe(None, time.monotonic() - started)
+                raise
+
+            retry_after = self.retry_after(response)
+            bucket.observe(
+                response.status_code, time.monotonic() - started, retry_after
+            )
+
+            if response.status_code != 429 or attempt == self.retries:
+                break
+
+            metrics.retry(host, "throttled")
+            time.sleep(retry_after or 0.5 * 2**attempt)
+
+        return response
+
+    def rates(self):
+        with self.lock:
+            return {
+                host: round(bucket.rate, 2) for host, bucket in self.buckets.items()
+            }
+
+
+limiter = RateLimiter(
+    rate=settings.RATE_LIMIT,
+    max_rate=settings.RATE_LIMIT_MAX,
+    slow_response=settings.SLOW_RESPONSE,
+)
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import settings
+from modules.config import logger
+from modules.rpc import RpcBatch, get_web3, to_int
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+class ReceiptWatcher:
+    """Polls every pending hash of a chain with one batched request per cycle"""
+
+    def __init__(self, web3, chain, poll_interval=2):
+        self.web3 = web3
+        self.chain = chain
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def watch(self, tx_hash, timeout=180):
+        """Returns a Future resolved with the receipt, or TimeoutError after `timeout`"""
+        tx_hash = tx_hash if isinstance(tx_hash, str) else tx_hash.hex()
+        future = Future()
+
+        with self.lock:
+            self.pending[tx_hash] = (future, time.monotonic() + timeout)
+
+        self.wakeup.set()
+        return future
+
+    def unwatch(self, tx_hash):
+        """Stops polling a hash whose outcome no longer matters"""
+        with self.lock:
+            future, _ = self.pending.pop(tx_hash, (None, None))
+
+        if future is not None:
+            future.cancel()
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+
+            with self.lock:
+                pending = dict(self.pending)
+                # Cleared under the lock, so a watch() that lands after the
+                # copy sets the event again instead of being lost
+                if not pending:
+                    self.wakeup.clear()
+
+            if not pending:
+                continue
+
+            try:
+                self.poll(pending)
+            except Exception as error:
+                logger.error(f"Receipt watcher | {self.chain}: {error}")
+
+            time.sleep(self.poll_interval)
+
+    def poll(self, pending):
+        batch = RpcBatch(self.web3)
+        hashes = list(pending)
+
+        for tx_hash in hashes:
+            batch.add("eth_getTransactionReceipt", [tx_hash])
+
+        now = time.monotonic()
+
+        try:
+            receipts = batch.execute(raise_errors=False)
+        except Exception as error:
+            # Deadlines still run out while the node is failing
+            logger.error(f"Receipt watcher | {self.chain}: {error}")
+            receipts = [error] * len(hashes)
+
+        for tx_hash, receipt in zip(hashes, receipts):
+            future, deadline = pending[tx_hash]
+
+            if isinstance(receipt, Exception):
+                logger.debug(f"Receipt watcher | {self.chain}: {receipt}")
+                receipt = None
+
+            if receipt is not None:
+                receipt["status"] = to_int(receipt["status"])
+                self.resolve(tx_hash, future.set_result, receipt)
+            elif now > deadline:
+                error = TimeoutError(f"{tx_hash} is not in the chain")
+                self.resolve(tx_hash, future.set_exception, error)
+
+    def resolve(self, tx_hash, setter, value):
+        with self.lock:
+            # Unwatched since this poll started, its future is already cancelled
+            if self.pending.pop(tx_hash, None) is None:
+                return
+
+        setter(value)
+
+
+def get_receipt_watcher(chain):
+    with _watchers_lock:
+        if chain not in _watchers:
+            _watchers[chain] = ReceiptWatcher(
+                get_web3(chain), chain, settings.RECEIPT_POLL_INTERVAL
+            )
+
+        return _watchers[chain]
@@ -0,0 +1,244 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from eth_account import Account
+
+import settings
+from modules.config import CHAIN_DATA, logger
+from modules.nonce import nonce_manager
+from modules.receipts import get_receipt_watcher
+from modules.rpc import get_web3
+from modules.scheduler import scheduler
+from modules.sinks import get_sink
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Node answers meaning this exact tx is already known
+KNOWN_ERRORS = ("already known", "known transaction")
+# Means an earlier version was mined, or on a first send that the local nonce is stale
+NONCE_TOO_LOW = "nonce too low"
+# Fields that must match for a second submit of a nonce to share the first one's outcome
+CALL_FIELDS = ("to", "value", "data")
+
+
+class PendingTx:
+    """One (address, nonce) and every hash broadcast for it. `future` resolves
+    with the receipt of whichever version was mined, or None if none was"""
+
+    def __init__(self, private_key, tx, label):
+        self.private_key = private_key
+        self.tx = dict(tx)
+        self.label = label
+        self.hashes = []
+        self.replacements = 0
+        self.deadline = None
+        self.future = Future()
+
+    @property
+    def key(self):
+        return self.tx["from"], self.tx["nonce"]
+
+
+class ReplacementEngine:
+    """Keeps broadcast transactions moving: while a nonce stays unmined it is
+    re-signed with fees raised by `bump` every `replace_after` seconds, up to
+    `max_replacements` times, then given up one interval later"""
+
+    def __init__(self, chain, replace_after=20, bump=1.2, max_replacements=5):
+        self.chain = chain
+        self.web3 = get_web3(chain)
+        self.explorer = CHAIN_DATA[chain]["explorer"]
+        self.replace_after = replace_after
+        self.bump = bump
+        self.max_replacements = max_replacements
+        self.watcher = get_receipt_watcher(chain)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        # Bumps do network I/O, so they run here instead of on the timer thread
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    @property
+    def lifetime(self):
+        return self.replace_after * (self.max_replacements + 1)
+
+    def submit(self, private_key, tx, label=""):
+        """Sign and broadcast `tx`. Transport errors are retried on the replacement
+        schedule, rejections by the node are raised. Submitting a nonce that is
+        already in flight returns its PendingTx when the call is the same"""
+        pending = PendingTx(private_key, tx, label)
+
+        with self.lock:
+            current = self.in_flight.get(pending.key)
+
+            if current is not None:
+                if any(current.tx.get(key) != tx.get(key) for key in CALL_FIELDS):
+                    raise ValueError(
+                        f"Nonce {tx['nonce']} is in flight with another call"
+                    )
+
+                return current
+
+            self.register(pending)
+
+        try:
+            self.broadcast(pending)
+        except requests.RequestException as error:
+            logger.warning(
+                f"{label} | Broadcast failed, retrying in {self.replace_after}s: {error}"
+            )
+        except Exception:
+            with self.lock:
+                self.in_flight.pop(pending.key, None)
+            raise
+
+        self.schedule(pending)
+        return pending
+
+    def track(self, private_key, tx, tx_hash, label=""):
+        """Take over a transaction that was already broadcast elsewhere"""
+        pending = PendingTx(private_key, tx, label)
+
+        with self.lock:
+            self.register(pending)
+
+        self.watch(pending, tx_hash)
+        self.schedule(pending)
+
+        return pending
+
+    def register(self, pending):
+        # Registered before the broadcast so a fast receipt always finds it
+        pending.deadline = time.monotonic() + self.lifetime
+        self.in_flight[pending.key] = pending
+
+    def schedule(self, pending):
+        scheduler.call_later(self.replace_after, lambda: self.wake(pending))
+
+    def wake(self, pending):
+        # Timers of resolved nonces can outlive the executor at exit
+        if not pending.future.done():
+            self.executor.submit(self.check, pending)
+
+    def broadcast(self, pending):
+        signed_tx = Account.sign_transaction(pending.tx, pending.private_key)
+
+        try:
+            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction).hex()
+        except ValueError as error:
+            # Failover can resend a tx the first node already took
+            if not self.is_accepted(pending, signed_tx, str(error).lower()):
+                raise
+
+            logger.debug(f"{pending.label} | Already known: {error}")
+            tx_hash = signed_tx.hash.hex()
+
+        action = "Replaced" if pending.hashes else "Sent"
+        logger.info(f"{pending.label} | {action}: {self.explorer}/tx/{tx_hash}")
+        get_sink("results/transactions.jsonl").write(
+            {
+                "address": pending.tx["from"],
+                "chain": self.chain,
+                "nonce": pending.tx["nonce"],
+                "tx_hash": tx_hash,
+                "replacement": pending.replacements,
+            }
+        )
+        self.watch(pending, tx_hash)
+
+    def is_accepted(self, pending, signed_tx, message):
+        if any(known in message for known in KNOWN_ERRORS):
+            return True
+
+        if NONCE_TOO_LOW not in message:
+            return False
+
+        if pending.hashes:
+            return True
+
+        # Only a first send that a node already took counts, not a stale nonce
+        try:
+            return self.web3.eth.get_transaction(signed_tx.hash) is not None
+        except Exception:
+            return False
+
+    def watch(self, pending, tx_hash):
+        pending.hashes.append(tx_hash)
+        future = self.watcher.watch(tx_hash, timeout=self.lifetime + self.replace_after)
+        future.add_done_callback(lambda done: self.on_receipt(pending, done))
+
+    def on_receipt(self, pending, done):
+        # Timeouts are handled by `check`, replaced versions are never mined
+        if not done.cancelled() and done.exception() is None:
+            self.finish(pending, done.result())
+
+    def finish(self, pending, receipt):
+        with self.lock:
+            if pending.future.done():
+                return
+
+            self.in_flight.pop(pending.key, None)
+
+        for tx_hash in pending.hashes:
+            self.watcher.unwatch(tx_hash)
+
+        address, nonce = pending.key
+
+        if receipt is not None:
+            nonce_manager.confirm(self.chain, address, nonce)
+        else:
+            nonce_manager.abandon(self.chain, address, nonce)
+
+        pending.future.set_result(receipt)
+
+    def bump_fees(self, tx):
+        if "gasPrice" in tx:
+            network_price = self.web3.eth.gas_price
+            tx["gasPrice"] = max(int(tx["gasPrice"] * self.bump), network_price)
+        else:
+            tx["maxPriorityFeePerGas"] = int(tx["maxPriorityFeePerGas"] * self.bump)
+            tx["maxFeePerGas"] = int(tx["maxFeePerGas"] * self.bump)
+
+    def check(self, pending):
+        if pending.future.done():
+            return
+
+        if pending.replacements >= self.max_replacements:
+            if time.monotonic() >= pending.deadline:
+                logger.error(
+                    f"{pending.label} | Nonce {pending.tx['nonce']} not mined after "
+                    f"{pending.replacements} replacements"
+                )
+                self.finish(pending, None)
+            else:
+                self.schedule(pending)
+            return
+
+        pending.replacements += 1
+
+        try:
+            # A tx the node never took is resent as is
+            if pending.hashes:
+                self.bump_fees(pending.tx)
+
+            self.broadcast(pending)
+        except Exception as error:
+            # Underpriced replacements get the next, higher bump
+            logger.warning(f"{pending.label} | Replacement failed: {error}")
+
+        self.schedule(pending)
+
+
+def get_replacement_engine(chain):
+    with _engines_lock:
+        if chain not in _engines:
+            _engines[chain] = ReplacementEngine(
+                chain,
+                replace_after=settings.REPLACE_AFTER,
+                bump=settings.FEE_BUMP,
+                max_replacements=settings.MAX_REPLACEMENTS,
+            )
+
+        return _engines[chain]
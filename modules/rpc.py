@@ -0,0 +1,244 @@
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+from web3 import HTTPProvider, Web3
+from web3.middleware import geth_poa_middleware
+
+import settings
+from modules.config import CHAIN_DATA
+from modules.endpoints import EndpointPool
+from modules.metrics import metrics
+from modules.ratelimit import limiter
+
+# Calls without side effects, safe to send to two nodes at once
+READ_METHODS = {
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_estimateGas",
+    "eth_feeHistory",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getBlockByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getTransactionCount",
+    "eth_getTransactionReceipt",
+    "eth_maxPriorityFeePerGas",
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=max(32, settings.CONCURRENCY * 4), thread_name_prefix="rpc-hedge"
+)
+
+
+def to_int(value):
+    return int(value, 16)
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).netloc
+
+        def attempt():
+            response = super(InstrumentedAdapter, self).send(request, **kwargs)
+            retries = getattr(response.raw, "retries", None)
+
+            if retries is not None:
+                metrics.retry(host, "http", len(retries.history))
+
+            return response
+
+        # 429s are left to the limiter, urllib3 only retries server errors
+        return limiter.call(host, attempt)
+
+
+class BatchHTTPProvider(HTTPProvider):
+    """JSON-RPC over a pool of endpoints: calls go to the best ranked URL and
+    fail over on transport errors, reads are hedged on the runner-up once
+    they take longer than the endpoint's p95"""
+
+    batch_counter = itertools.count()
+
+    def __init__(self, endpoint_uris, request_kwargs=None, session=None):
+        if isinstance(endpoint_uris, str):
+            endpoint_uris = [endpoint_uris]
+
+        super().__init__(endpoint_uris[0], request_kwargs)
+        self.pool = EndpointPool(endpoint_uris)
+        # web3 caches sessions per thread, so other threads would silently get a
+        # default requests.Session without our pool, retries and rate limiting
+        self.session = session or requests.Session()
+
+    def send(self, endpoint, data, name):
+        started = time.perf_counter()
+
+        try:
+            with metrics.track(endpoint.host, name) as call:
+                response = self.session.post(
+                    endpoint.url, data=data, **self.get_request_kwargs()
+                )
+                response.raise_for_status()
+                decoded = self.decode_rpc_response(response.content)
+
+                if isinstance(decoded, dict) and "error" in decoded:
+                    call.status = "rpc_error"
+        except requests.RequestException:
+            endpoint.record(time.perf_counter() - started, ok=False)
+            raise
+
+        endpoint.record(time.perf_counter() - started, ok=True)
+        return decoded
+
+    def failover(self, endpoints, data, name):
+        for index, endpoint in enumerate(endpoints):
+            try:
+                return self.send(endpoint, data, name)
+            except requests.RequestException:
+                if index == len(endpoints) - 1:
+                    raise
+
+                metrics.retry(endpoint.host, "failover")
+
+    def hedged(self, endpoints, data, name):
+        primary, backup = endpoints[:2]
+        futures = [_hedge_executor.submit(self.send, primary, data, name)]
+
+        done, _ = wait(futures, timeout=primary.deadline())
+        if not done:
+            metrics.retry(primary.host, "hedged")
+            futures.append(_hedge_executor.submit(self.send, backup, data, name))
+
+        # The first answer wins, the slower request finishes in the background
+        error = None
+        for future in as_completed(futures):
+            try:
+                return future.result()
+            except requests.RequestException as exc:
+                error = exc
+
+        if len(endpoints) > len(futures):
+            return self.failover(endpoints[len(futures) :], data, name)
+
+        raise error
+
+    def post(self, data, name, read=False):
+        endpoints = self.pool.ranked()
+
+        if read and len(endpoints) > 1:
+            return self.hedged(endpoints, data, name)
+
+        return self.failover(endpoints, data, name)
+
+    def make_request(self, method, params):
+        return self.post(
+            self.encode_rpc_request(method, params), method, read=method in READ_METHODS
+        )
+
+    def make_batch_request(self, calls):
+        ids = [next(self.batch_counter) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+            for request_id, (method, params) in zip(ids, calls)
+        ]
+        methods = {method for method, _ in calls}
+        name = "batch:" + "+".join(sorted(methods))
+
+        response = self.post(
+            json.dumps(payload).encode(), name, read=methods <= READ_METHODS
+        )
+
+        # Some nodes answer a batch with a single error object instead of a list
+        if not isinstance(response, list):
+            return [self.make_request(method, params) for method, params in calls]
+
+        by_id = {item.get("id"): item for item in response}
+        return [by_id.get(request_id, {}) for request_id in ids]
+
+
+class RpcBatch:
+    def __init__(self, web3):
+        self.provider = web3.provider
+        self.calls = []
+        self.formatters = []
+
+    def add(self, method, params=None, formatter=None):
+        self.calls.append((method, params or []))
+        self.formatters.append(formatter)
+        return len(self.calls) - 1
+
+    def execute(self, raise_errors=True):
+        """Results in call order; failed calls raise, or come back as ValueError"""
+        if not self.calls:
+            return []
+
+        if isinstance(self.provider, BatchHTTPProvider):
+            responses = self.provider.make_batch_request(self.calls)
+        else:
+            responses = [
+                self.provider.make_request(method, params)
+                for method, params in self.calls
+            ]
+
+        results = []
+        for (method, _), formatter, response in zip(
+            self.calls, self.formatters, responses
+        ):
+            if "error" in response or "result" not in response:
+                error = ValueError(
+                    f"{method} failed: {response.get('error', response)}"
+                )
+
+                if raise_errors:
+                    raise error
+
+                results.append(error)
+                continue
+
+            result = response["result"]
+            results.append(formatter(result) if formatter else result)
+
+        self.calls, self.formatters = [], []
+        return results
+
+
+def get_session():
+    pool_size = max(20, settings.CONCURRENCY)
+    retries = Retry(
+        total=5,
+        backoff_factor=0.2,
+        status_forcelist=[500, 502, 503, 504],
+    )
+    adapter = InstrumentedAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def get_web3(chain):
+    """Process-wide Web3 client per chain, shared by every wallet"""
+    with _providers_lock:
+        if chain not in _providers:
+            web3 = Web3(
+                BatchHTTPProvider(
+                    CHAIN_DATA[chain]["rpc"],
+                    session=get_session(),
+                    request_kwargs={"timeout": settings.RPC_TIMEOUT},
+                )
+            )
+            web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+            _providers[chain] = web3
+
+        return _providers[chain]
@@ -0,0 +1,94 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class Scheduler:
+    """Priority queue of due times served by one timer thread.
+
+    Wallet threads hold an engine slot while they work. Sleeping through the
+    scheduler parks the thread and hands its slot to another wallet until the
+    deadline passes, and a cooldown keeps the slot busy after the wallet is done
+    without keeping a thread around.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.local = threading.local()
+        self.slots = None
+        self.thread = None
+        # Multiplier for every sleep and cooldown, benchmarks set it to 0
+        self.time_scale = 1.0
+
+    def set_slots(self, concurrency):
+        self.slots = threading.Semaphore(concurrency)
+
+    def call_at(self, due, callback):
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+            heapq.heappush(self.queue, (due, next(self.counter), callback))
+            self.condition.notify()
+
+    def call_later(self, delay, callback):
+        self.call_at(time.monotonic() + delay, callback)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+
+                due, _, callback = self.queue[0]
+                remaining = due - time.monotonic()
+
+                if remaining > 0:
+                    self.condition.wait(timeout=remaining)
+                    continue
+
+                heapq.heappop(self.queue)
+
+            callback()
+
+    def in_slot(self):
+        return getattr(self.local, "in_slot", False)
+
+    def acquire_slot(self):
+        self.slots.acquire()
+        self.local.in_slot = True
+        self.local.cooldown = 0
+
+    def release_slot(self):
+        self.local.in_slot = False
+        cooldown = getattr(self.local, "cooldown", 0)
+
+        if cooldown > 0:
+            self.call_later(cooldown, self.slots.release)
+        else:
+            self.slots.release()
+
+    def sleep(self, duration):
+        duration *= self.time_scale
+
+        if not self.in_slot():
+            time.sleep(duration)
+            return
+
+        wakeup = threading.Event()
+        self.call_later(duration, wakeup.set)
+
+        self.slots.release()
+        wakeup.wait()
+        self.slots.acquire()
+
+    def cooldown(self, duration):
+        """Keep the current slot reserved for `duration` after the wallet finishes"""
+        self.local.cooldown = duration * self.time_scale
+
+
+scheduler = Scheduler()
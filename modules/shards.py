@@ -0,0 +1,128 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import settings
+from modules.config import logger
+from modules.keys import KeyFile, address_book
+from modules.metrics import metrics
+from modules.sinks import close_sinks, merge_shards, set_shard
+
+_log_queue = None
+
+
+def init_worker(queue):
+    global _log_queue
+    _log_queue = queue
+
+
+def queue_sink(index):
+    def sink(message):
+        record = message.record
+        _log_queue.put(
+            (
+                record["time"],
+                record["level"].name,
+                f"[shard {index}] {message.rstrip()}",
+            )
+        )
+
+    return sink
+
+
+def forward_logs(queue):
+    """Re-emits shard records through the parent's sinks in arrival order"""
+    while True:
+        item = queue.get()
+
+        if item is None:
+            return
+
+        logged_at, level, message = item
+        logger.patch(lambda record, at=logged_at: record.update(time=at)).log(
+            level, message
+        )
+
+
+def run_shard(index, count, action, keys_path, proxies, concurrency, nft_balances):
+    import main as app
+
+    set_shard(index)
+    settings.CONCURRENCY = concurrency
+    logger.remove()
+    logger.add(queue_sink(index), format="{message}")
+
+    keys = KeyFile(keys_path, shuffle=settings.SHUFFLE_WALLETS, shard=(index, count))
+
+    try:
+        app.run_action(action, keys, proxies, concurrency, nft_balances)
+    finally:
+        address_book.save()
+        close_sinks()
+
+    return metrics.state()
+
+
+def run_sharded(action, keys_path, proxies, shards, concurrency):
+    """Split the key file between `shards` processes running `concurrency` wallets each,
+    then fold their outputs and metrics back into this process"""
+    import main as app
+
+    # Derive every address up front so shards only read the cache
+    keys = KeyFile(keys_path)
+    address_book.resolve(keys)
+
+    # One balance scan here instead of every shard scanning the same blocks
+    nft_balances = None
+    if action in ("check_balance", "mint"):
+        try:
+            nft_balances = app.get_nft_balances(keys)
+        except Exception as error:
+            logger.warning(
+                f"NFT balance scan failed, shards scan their own keys: {error}"
+            )
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    forwarder = threading.Thread(target=forward_logs, args=(queue,), daemon=True)
+    forwarder.start()
+
+    results = {}
+    logger.info(f"Running {action} in {shards} shards")
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=shards,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(queue,),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    run_shard,
+                    index,
+                    shards,
+                    action,
+                    keys_path,
+                    proxies,
+                    concurrency,
+                    nft_balances,
+                ): index
+                for index in range(shards)
+            }
+
+            for future in as_completed(futures):
+                index = futures[future]
+
+                try:
+                    results[index] = future.result()
+                except Exception as error:
+                    logger.error(f"Shard {index} failed: {error}")
+    finally:
+        queue.put(None)
+        forwarder.join()
+
+    for state in results.values():
+        metrics.merge(state)
+
+    merge_shards(shards)
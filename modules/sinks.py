@@ -0,0 +1,142 @@
+import atexit
+import csv
+import glob
+import json
+import os
+import shutil
+import threading
+
+from modules.scheduler import scheduler
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+_shard = None
+
+
+class ResultSink:
+    """One buffered handle per output file, flushed by row count or on a timer"""
+
+    def __init__(self, path, headers=None, flush_size=100, flush_interval=5):
+        self.path = path
+        self.headers = headers
+        self.format = "jsonl" if path.endswith(".jsonl") else "csv"
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.flush_scheduled = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.file = open(path, mode="a", newline="")
+        self.writer = csv.writer(self.file) if self.format == "csv" else None
+
+        if self.writer and headers and self.file.tell() == 0:
+            self.writer.writerow(headers)
+
+    def write(self, row):
+        with self.lock:
+            self.buffer.append(row)
+
+            if len(self.buffer) >= self.flush_size:
+                self.flush_locked()
+            elif not self.flush_scheduled:
+                # A timer, not the next write, so rows reach disk during long pauses
+                self.flush_scheduled = True
+                scheduler.call_later(self.flush_interval, self.flush_due)
+
+    def flush_due(self):
+        with self.lock:
+            self.flush_scheduled = False
+
+            if not self.file.closed:
+                self.flush_locked()
+
+    def flush_locked(self):
+        for row in self.buffer:
+            if self.writer:
+                self.writer.writerow(
+                    [row.get(h) for h in self.headers] if isinstance(row, dict) else row
+                )
+            else:
+                self.file.write(json.dumps(row, default=str) + "\n")
+
+        self.buffer.clear()
+        self.file.flush()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.flush_locked()
+                self.file.close()
+
+
+def shard_path(path, index):
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard{index}{extension}"
+
+
+def set_shard(index):
+    """Inside a shard process every sink writes to <name>.shard<index>.<ext>"""
+    global _shard
+    _shard = index
+
+
+def get_sink(path, headers=None):
+    with _sinks_lock:
+        if path not in _sinks:
+            target = path if _shard is None else shard_path(path, _shard)
+            _sinks[path] = ResultSink(target, headers)
+
+        return _sinks[path]
+
+
+def merge_shard(path, source):
+    """Appends a shard's output to the regular file and removes it"""
+    headers = None
+
+    # CSV shard files start with the header row the regular file needs
+    if not path.endswith(".jsonl"):
+        with open(source, newline="") as f:
+            headers = next(csv.reader(f), None)
+
+    sink = get_sink(path, headers)
+
+    with open(source, newline="") as f:
+        if headers:
+            next(f, None)
+
+        with sink.lock:
+            sink.flush_locked()
+            shutil.copyfileobj(f, sink.file)
+            sink.file.flush()
+
+    os.remove(source)
+
+
+def merge_shards(count):
+    """Merges every <name>.shard<index>.<ext> under the working directory,
+    including files of shards that failed before reporting back"""
+    for index in range(count):
+        suffix = f".shard{index}"
+
+        for source in sorted(glob.glob(f"**/*{suffix}.*", recursive=True)):
+            root, extension = os.path.splitext(source)
+
+            if root.endswith(suffix):
+                merge_shard(root[: -len(suffix)] + extension, source)
+
+
+@atexit.register
+def close_sinks():
+    with _sinks_lock:
+        for sink in _sinks.values():
+            sink.close()
+
+        _sinks.clear()
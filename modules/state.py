@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class StateStore:
+    """Per-address progress kept between runs so finished steps can be skipped"""
+
+    def __init__(self, path="data/state.db"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        # Shard processes share the file, so wait on their write locks
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS mints (
+                address TEXT NOT NULL,
+                tx_hash TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                address TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                verified_at REAL NOT NULL,
+                PRIMARY KEY (address, task_id)
+            );
+            CREATE TABLE IF NOT EXISTS journeys (
+                address TEXT PRIMARY KEY,
+                xp INTEGER,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sessions (
+                address TEXT PRIMARY KEY,
+                cookies TEXT NOT NULL,
+                quest_user_id TEXT,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS holders (
+                token TEXT NOT NULL,
+                address TEXT NOT NULL,
+                balance INTEGER NOT NULL,
+                PRIMARY KEY (token, address)
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT PRIMARY KEY,
+                block INTEGER NOT NULL
+            );
+            """)
+
+    def execute(self, query, params=()):
+        with self.lock, self.conn:
+            return self.conn.execute(query, params).fetchall()
+
+    def record_mint(self, address, tx_hash=None):
+        self.execute(
+            "INSERT INTO mints (address, tx_hash, created_at) VALUES (?, ?, ?)",
+            (address, tx_hash, time.time()),
+        )
+
+    def get_mints(self, address):
+        rows = self.execute("SELECT tx_hash FROM mints WHERE address = ?", (address,))
+        return [tx_hash for (tx_hash,) in rows]
+
+    def record_task(self, address, task_id):
+        self.execute(
+            "INSERT OR REPLACE INTO tasks (address, task_id, verified_at) VALUES (?, ?, ?)",
+            (address, task_id, time.time()),
+        )
+
+    def verified_tasks(self, address):
+        rows = self.execute("SELECT task_id FROM tasks WHERE address = ?", (address,))
+        return {task_id for (task_id,) in rows}
+
+    def record_xp(self, address, xp):
+        self.execute(
+            "INSERT OR REPLACE INTO journeys (address, xp, updated_at) VALUES (?, ?, ?)",
+            (address, xp, time.time()),
+        )
+
+    def get_xp(self, address):
+        rows = self.execute("SELECT xp FROM journeys WHERE address = ?", (address,))
+        return rows[0][0] if rows else None
+
+    def save_session(self, address, cookies, quest_user_id, expires_at):
+        self.execute(
+            "INSERT OR REPLACE INTO sessions (address, cookies, quest_user_id, expires_at) VALUES (?, ?, ?, ?)",
+            (address, json.dumps(cookies), quest_user_id, expires_at),
+        )
+
+    def get_session(self, address):
+        """Returns (cookies, quest_user_id) of an unexpired session or None"""
+        rows = self.execute(
+            "SELECT cookies, quest_user_id FROM sessions WHERE address = ? AND expires_at > ?",
+            (address, time.time()),
+        )
+        return (json.loads(rows[0][0]), rows[0][1]) if rows else None
+
+    def drop_session(self, address):
+        self.execute("DELETE FROM sessions WHERE address = ?", (address,))
+
+    def get_checkpoint(self, name):
+        rows = self.execute("SELECT block FROM checkpoints WHERE name = ?", (name,))
+        return rows[0][0] if rows else None
+
+    def set_checkpoint(self, name, block):
+        self.execute(
+            "INSERT OR REPLACE INTO checkpoints (name, block) VALUES (?, ?)",
+            (name, block),
+        )
+
+    def apply_transfers(self, token, expected_block, block, deltas):
+        """Adds balance deltas and moves the checkpoint to `block` in one
+        transaction, unless another process already moved it"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+            try:
+                row = self.conn.execute(
+                    "SELECT block FROM checkpoints WHERE name = ?", (token,)
+                ).fetchone()
+
+                if (row[0] if row else None) != expected_block:
+                    self.conn.rollback()
+                    return False
+
+                self.conn.executemany(
+                    """
+                    INSERT INTO holders (token, address, balance) VALUES (?, ?, ?)
+                    ON CONFLICT (token, address) DO UPDATE SET balance = balance + excluded.balance
+                    """,
+                    [(token, address, delta) for address, delta in deltas.items()],
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (name, block) VALUES (?, ?)",
+                    (token, block),
+                )
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+        return True
+
+    def get_holder_balances(self, token, addresses, chunk_size=500):
+        lowered = [address.lower() for address in addresses]
+        balances = {}
+
+        for start in range(0, len(lowered), chunk_size):
+            chunk = lowered[start : start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            balances.update(
+                self.execute(
+                    f"SELECT address, balance FROM holders WHERE token = ? AND address IN ({placeholders})",
+                    (token, *chunk),
+                )
+            )
+
+        return {address: balances.get(address.lower(), 0) for address in addresses}
+
+
+state = StateStore()
@@ -0,0 +1,180 @@
+import random
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+from eth_utils import to_checksum_address
+
+import settings
+from modules.cache import get_chain_id
+from modules.config import CHAIN_DATA, logger
+from modules.keys import address_book
+from modules.nonce import nonce_manager
+from modules.replacements import get_replacement_engine
+from modules.rpc import RpcBatch, get_web3, to_int
+from modules.sinks import get_sink
+from modules.utils import sleep
+
+
+def sign_transfer(tx, private_key):
+    signed_tx = Account.sign_transaction(tx, private_key)
+    return signed_tx.rawTransaction.hex(), signed_tx.hash.hex()
+
+
+class TransferPipeline:
+    """Stage one reads balances in bulk and signs offline in a process pool,
+    stage two broadcasts the raw transactions in JSON-RPC batches"""
+
+    def __init__(self, chain="0g", batch_size=500):
+        self.chain = chain
+        self.web3 = get_web3(chain)
+        self.batch_size = batch_size
+        self.explorer = CHAIN_DATA[chain]["explorer"]
+
+    def chunks(self, items, size):
+        for start in range(0, len(items), size):
+            yield items[start : start + size]
+
+    def fetch_accounts(self, addresses):
+        """Balance and pending nonce per address, None where the node failed"""
+        accounts = []
+
+        for chunk in self.chunks(addresses, self.batch_size):
+            batch = RpcBatch(self.web3)
+
+            for address in chunk:
+                batch.add("eth_getBalance", [address, "latest"], to_int)
+                batch.add("eth_getTransactionCount", [address, "pending"], to_int)
+
+            results = batch.execute(raise_errors=False)
+
+            for address, balance, nonce in zip(chunk, results[0::2], results[1::2]):
+                error = next(
+                    (r for r in (balance, nonce) if isinstance(r, Exception)), None
+                )
+
+                if error:
+                    logger.error(f"{address} | Failed to fetch account: {error}")
+                    accounts.append(None)
+                else:
+                    accounts.append((balance, nonce))
+
+        batch = RpcBatch(self.web3)
+        batch.add("eth_gasPrice", formatter=to_int)
+        (gas_price,) = batch.execute()
+
+        return accounts, gas_price
+
+    def build(self, keys, amount_range):
+        keys = list(keys)
+        addresses = address_book.resolve(keys)
+        accounts, gas_price = self.fetch_accounts(addresses)
+
+        if self.chain == "0g":
+            gas_price *= 2
+
+        transfers = []
+        for key, address, account in zip(keys, addresses, accounts):
+            if account is None:
+                continue
+
+            balance, nonce = account
+
+            if balance == 0:
+                logger.warning(f"{address} | This wallet has no balance, skipping")
+                continue
+
+            nonce_manager.sync(self.chain, address, nonce)
+            transfer_percentage = random.randint(*amount_range)
+            # Random bytes, deriving a key per transfer cost a third of the signing
+            recipient = to_checksum_address("0x" + secrets.token_hex(20))
+
+            tx = {
+                "chainId": get_chain_id(self.web3, self.chain),
+                "from": address,
+                "to": recipient,
+                "nonce": nonce_manager.allocate(self.web3, self.chain, address),
+                "value": int(balance * (transfer_percentage / 100)),
+                "gas": 21000,
+                "gasPrice": gas_price,
+            }
+            transfers.append((key, tx))
+
+        return transfers
+
+    def sign(self, transfers, chunksize=64):
+        keys = [key for key, _ in transfers]
+        txs = [tx for _, tx in transfers]
+
+        # A pool costs more than it saves below one chunk
+        if len(txs) < chunksize:
+            return list(map(sign_transfer, txs, keys))
+
+        with ProcessPoolExecutor(max_workers=settings.KEY_DERIVATION_WORKERS) as pool:
+            return list(pool.map(sign_transfer, txs, keys, chunksize=chunksize))
+
+    def broadcast(self, transfers, signed, send_batch_size):
+        """Sends raw transactions in batches, then hands each accepted one to
+        the replacement engine which re-sends it with higher fees if it stalls"""
+        pending = []
+        items = list(zip(transfers, signed))
+        engine = get_replacement_engine(self.chain)
+
+        for index, chunk in enumerate(self.chunks(items, send_batch_size)):
+            if index > 0:
+                sleep(*settings.SLEEP_BETWEEN_WALLETS)
+
+            batch = RpcBatch(self.web3)
+            for _, (raw_tx, _) in chunk:
+                batch.add("eth_sendRawTransaction", [raw_tx])
+
+            for ((key, tx), (_, tx_hash)), result in zip(
+                chunk, batch.execute(raise_errors=False)
+            ):
+                label = f"{tx['from']} | Send A0GI"
+
+                if isinstance(result, Exception):
+                    logger.error(f"{label} | {result}")
+                    nonce_manager.release(self.chain, tx["from"], tx["nonce"])
+                    continue
+
+                logger.info(f"{label} | {self.explorer}/tx/{tx_hash}")
+                get_sink("results/transactions.jsonl").write(
+                    {
+                        "address": tx["from"],
+                        "chain": self.chain,
+                        "nonce": tx["nonce"],
+                        "tx_hash": tx_hash,
+                        "replacement": 0,
+                    }
+                )
+                pending.append(engine.track(key, tx, tx_hash, label))
+
+        return pending
+
+    def settle(self, pending):
+        # Nonces are confirmed or reset by the engine once each future resolves
+        confirmed = 0
+
+        for tx in pending:
+            receipt = tx.future.result()
+
+            if receipt is None:
+                logger.error(f"{tx.label} | Transaction is not in the chain")
+            elif receipt["status"] == 1:
+                confirmed += 1
+            else:
+                logger.error(f"{tx.label} | Transaction failed")
+
+        return confirmed
+
+    def run(self, keys, amount_range, send_batch_size=1):
+        transfers = self.build(keys, amount_range)
+        logger.info(f"Signing {len(transfers)} transfers")
+
+        signed = self.sign(transfers)
+        pending = self.broadcast(transfers, signed, send_batch_size)
+        confirmed = self.settle(pending)
+
+        logger.success(f"{confirmed}/{len(transfers)} transfers confirmed \n")
+        return confirmed
@@ -1,5 +1,3 @@
-import csv
-import os
 import random
 import time
 from datetime import datetime
@@ -7,16 +5,26 @@ from datetime import datetime
 from tqdm import tqdm
 
 import settings
-from modules.config import logger, mainnet_client
+from modules.gas import gas_oracle
+from modules.scheduler import scheduler
 
 
 def random_sleep(min_time, max_time):
     duration = random.randint(min_time, max_time)
-    time.sleep(duration)
+    scheduler.sleep(duration)
 
 
 def sleep(from_sleep, to_sleep):
     x = random.randint(from_sleep, to_sleep)
+
+    # Inside the wallet engine the gap becomes a slot cooldown, no thread waits
+    if scheduler.in_slot():
+        scheduler.cooldown(x)
+        return
+
+    if not x:
+        return
+
     desc = datetime.now().strftime("%H:%M:%S")
 
     for _ in tqdm(
@@ -27,23 +35,11 @@ def sleep(from_sleep, to_sleep):
 
 
 def get_gas():
-    try:
-        gas_price = mainnet_client.eth.gas_price
-        gwei = mainnet_client.from_wei(gas_price, "gwei")
-        return gwei
-    except Exception as error:
-        logger.error(error)
+    return gas_oracle.get("ethereum")
 
 
 def wait_gas():
-    while True:
-        gas = get_gas()
-
-        if gas > settings.MAX_GWEI:
-            logger.info(f"Current gwei {gas} > {settings.MAX_GWEI}")
-            random_sleep(60, 60)
-        else:
-            break
+    gas_oracle.wait_below(settings.MAX_GWEI, chain="ethereum")
 
 
 def check_gas(func):
@@ -52,19 +48,3 @@ def check_gas(func):
         return func(*args, **kwargs)
 
     return wrapper
-
-
-def write_to_csv(path, headers, data):
-    directory = os.path.dirname(path)
-
-    if directory:
-        if not os.path.exists(directory):
-            os.makedirs(directory, exist_ok=True)
-
-    with open(path, mode="a", newline="") as file:
-        writer = csv.writer(file)
-
-        if file.tell() == 0:
-            writer.writerow(headers)
-
-        writer.writerow(data)
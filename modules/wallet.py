@@ -1,50 +1,31 @@
 import random
 import secrets
-import time
 
-import requests
+from eth_abi import decode
 from eth_account import Account
-from requests.adapters import HTTPAdapter, Retry
-from web3 import HTTPProvider, Web3
-from web3.exceptions import TransactionNotFound
-from web3.middleware import geth_poa_middleware
+from hexbytes import HexBytes
 
-import settings as SETTINGS
+from modules.cache import get_chain_id, get_contract, token_metadata
 from modules.config import CHAIN_DATA, ERC20_ABI, logger
+from modules.nonce import nonce_manager
+from modules.replacements import get_replacement_engine
+from modules.rpc import RpcBatch, get_web3, to_int
+from modules.scheduler import scheduler
 
 
 class Wallet:
-    def __init__(self, private_key, counter, chain="base"):
+    def __init__(self, private_key, counter, chain="base", address=None):
         self.private_key = private_key
-        self.account = Account.from_key(private_key)
-        self.address = self.account.address
-        self.session = self.get_session()
+        self.address = address or Account.from_key(private_key).address
         self.chain = chain
-        self.web3 = Web3(
-            HTTPProvider(
-                CHAIN_DATA[chain]["rpc"],
-                session=self.session,
-                request_kwargs={"timeout": 180},
-            )
-        )
+        self.web3 = get_web3(chain)
         self.explorer = CHAIN_DATA[chain]["explorer"]
         self.counter = counter
         self.label = f"{self.counter} {self.address} |"
+        self.last_tx_hash = None
 
-        self.web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-    def get_session(self):
-        retries = Retry(
-            total=5,
-            backoff_factor=0.2,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retries)
-        session = requests.Session()
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-
-        return session
+    def batch(self):
+        return RpcBatch(self.web3)
 
     def __str__(self):
         return f"Wallet(address={self.address})"
@@ -53,11 +34,10 @@ class Wallet:
         return self.web3.to_checksum_address(address)
 
     def get_contract(self, address, abi=None):
-        contract_address = Web3.to_checksum_address(address)
         if not abi:
             abi = ERC20_ABI
 
-        return self.web3.eth.contract(address=contract_address, abi=abi)
+        return get_contract(self.web3, self.chain, address, abi)
 
     def get_balance(self, token_addr=None):
         if token_addr == None:
@@ -70,81 +50,119 @@ class Wallet:
 
     def get_token_info(self, token_addr):
         token = self.get_contract(token_addr)
+        batch = self.batch()
+
+        calls = [("balanceOf", [self.address], "uint256")]
+        for fn_name, output in [("decimals", "uint8"), ("symbol", "string")]:
+            if token_metadata.get(self.chain, token.address, fn_name) is None:
+                calls.append((fn_name, [], output))
+
+        for fn_name, args, output in calls:
+            call = {"to": token.address, "data": token.encodeABI(fn_name, args)}
+            batch.add(
+                "eth_call",
+                [call, "latest"],
+                lambda data, output=output: decode([output], HexBytes(data))[0],
+            )
+
+        balance, *values = batch.execute()
 
-        balance = token.functions.balanceOf(self.address).call()
-        decimals = token.functions.decimals().call()
-        symbol = token.functions.symbol().call()
+        for (fn_name, _, _), value in zip(calls[1:], values):
+            token_metadata.set(self.chain, token.address, fn_name, value)
+
+        decimals = token_metadata.get(self.chain, token.address, "decimals")
+        symbol = token_metadata.get(self.chain, token.address, "symbol")
 
         return balance, decimals, symbol
 
     def get_tx_data(self, value=0, eip1559=True, **kwargs):
+        batch = self.batch()
+        synced = nonce_manager.is_synced(self.chain, self.address)
+
+        if not synced:
+            batch.add("eth_getTransactionCount", [self.address, "pending"], to_int)
+
+        if eip1559 == False:
+            batch.add("eth_gasPrice", formatter=to_int)
+
+        results = batch.execute()
+
+        if not synced:
+            nonce_manager.sync(self.chain, self.address, results.pop(0))
+
         tx_data = {
-            "chainId": self.web3.eth.chain_id,
+            "chainId": get_chain_id(self.web3, self.chain),
             "from": self.address,
-            "nonce": self.web3.eth.get_transaction_count(self.address),
+            "nonce": nonce_manager.allocate(self.web3, self.chain, self.address),
             "value": value,
             **kwargs,
         }
 
         if eip1559 == False:
-            tx_data["gasPrice"] = self.web3.eth.gas_price
+            tx_data["gasPrice"] = results[0]
 
         if self.chain == "0g":
             tx_data["gasPrice"] = tx_data["gasPrice"] * 2
 
         return tx_data
 
-    def await_tx(self, tx_hash, timeout=180):
-        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
-
-        total_time = 0
-        poll_latency = 20
-
-        while True:
-            try:
-                receipt = self.web3.eth.wait_for_transaction_receipt(
-                    tx_hash, timeout=timeout
-                )
-
-                if receipt.status == 1:
-                    logger.success(f"{self.label} Tx confirmed \n")
-                    return True
-                elif receipt.status is None:
-                    logger.warning(f"{self.label} Waiting for tx confirmation...")
-                    time.sleep(poll_latency)
-                else:
-                    logger.error(f"{self.label} Transaction failed")
-                    return False
-
-            except TransactionNotFound:
-                if total_time > timeout:
-                    logger.error(
-                        f"{self.label} Transaction is not in the chain after {timeout} seconds"
-                    )
-                    return False
-
-                logger.warning(f"{self.label} Waiting for tx confirmation...")
-                total_time += poll_latency
-                time.sleep(poll_latency)
-
-    def send_tx(self, tx, tx_label="", retry=0, increment=1.1):
-        try:
-            if retry > 0:
-                # Increment gas by 10% for each retry & recalculate nonce
-                tx["gas"] = int(tx["gas"] * increment)
-                tx["nonce"] = self.web3.eth.get_transaction_count(self.address)
+    def get_fees(self):
+        """EIP-1559 fee fields as web3 would fill them, in a single batch"""
+        batch = self.batch()
+        batch.add("eth_maxPriorityFeePerGas", formatter=to_int)
+        batch.add(
+            "eth_getBlockByNumber",
+            ["latest", False],
+            lambda block: to_int(block["baseFeePerGas"]),
+        )
+        priority_fee, base_fee = batch.execute(raise_errors=False)
+
+        if isinstance(priority_fee, Exception):
+            priority_fee = self.web3.eth.max_priority_fee
+
+        if isinstance(base_fee, Exception):
+            raise base_fee
+
+        return {
+            "maxPriorityFeePerGas": priority_fee,
+            "maxFeePerGas": priority_fee + 2 * base_fee,
+        }
+
+    def await_tx(self, pending):
+        receipt = pending.future.result()
 
-            signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            logger.info(f"{tx_label} | {self.explorer}/tx/{tx_hash.hex()}")
+        if receipt is None:
+            logger.error(f"{self.label} Transaction is not in the chain")
+            return False
 
-            return self.await_tx(tx_hash)
+        self.last_tx_hash = receipt["transactionHash"]
 
+        if receipt["status"] == 1:
+            logger.success(f"{self.label} Tx confirmed \n")
+            return True
+
+        logger.error(f"{self.label} Transaction failed")
+        return False
+
+    def send_tx(self, tx, tx_label="", wait=True):
+        """Broadcast through the chain's replacement engine, which re-sends the
+        same nonce with higher fees while it stays unmined. With wait=False the
+        PendingTx is returned and its future reports the outcome"""
+        try:
+            pending = get_replacement_engine(self.chain).submit(
+                self.private_key, tx, tx_label
+            )
         except Exception as error:
-            logger.error(error)
-            if retry < SETTINGS.RETRY_COUNT:
-                time.sleep(random.randint(15, 20))
-                return self.send_tx(tx, tx_label, retry=retry + 1)
+            logger.error(f"{tx_label} | {error}")
+            nonce_manager.release(self.chain, self.address, tx["nonce"])
+            return False
+
+        self.last_tx_hash = pending.hashes[0] if pending.hashes else None
+
+        if not wait:
+            return pending
+
+        return self.await_tx(pending)
 
     def check_allowance(self, token_addr, spender):
         token = self.get_contract(token_addr)
@@ -171,7 +189,7 @@ class Wallet:
         tx = token.functions.approve(spender, amount).build_transaction(tx_data)
 
         status = self.send_tx(tx, tx_label)
-        time.sleep(random.uniform(7, 20))
+        scheduler.sleep(random.uniform(7, 20))
         return status
 
     def send_native_token_to_a_rand_wallet(self, amount_range):
@@ -191,4 +209,4 @@ class Wallet:
             eip1559=False, to=recipient, value=transfer_amount, gas=21000
         )
 
-        return self.send_tx(tx, increment=2, tx_label=f"{self.label} Send A0GI")
+        return self.send_tx(tx, tx_label=f"{self.label} Send A0GI")
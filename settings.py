@@ -4,12 +4,32 @@
 
 SHUFFLE_WALLETS = True
 USE_PROXY = True
+CONCURRENCY = 1  # number of wallets processed at once
+SHARDS = 1  # worker processes splitting keys.txt, each runs CONCURRENCY wallets
+KEY_DERIVATION_WORKERS = None  # processes deriving addresses, None = all cores
 
 SLEEP_BETWEEN_WALLETS = [100, 200]
 SLEEP_BETWEEN_ACTIONS = [5, 10]
-RETRY_COUNT = 1
+REPLACE_AFTER = 20  # seconds before an unmined tx is re-sent with higher fees
+FEE_BUMP = 1.2  # fee multiplier per replacement, nodes require at least 1.1
+MAX_REPLACEMENTS = 5  # re-sends of one nonce before it is given up
+RECEIPT_POLL_INTERVAL = 2  # seconds between receipt checks
+RPC_TIMEOUT = 30  # seconds before an RPC request fails over to the next endpoint
+METRICS_PORT = None  # e.g. 9100 to serve live request metrics
+RATE_LIMIT = 10  # starting requests/second per host, adapts to 429s and latency
+RATE_LIMIT_MAX = 200  # requests/second a host is never pushed beyond
+SLOW_RESPONSE = 5  # seconds, slower answers count as a throttling signal
 
 MAX_GWEI = 30
+GAS_REFRESH_INTERVAL = 12  # seconds between gas price updates
+GAS_PRICE_TTL = 60  # seconds a cached gas price stays valid
+
+MULTICALL_BATCH_SIZE = 500
+HOLDER_INDEX = True  # read NFT balances from a Transfer log index in data/state.db
+HOLDER_INDEX_START_BLOCK = None  # first block to index, None = find it once
+LOGS_CHUNK_SIZE = 10_000  # blocks per eth_getLogs request
+HOLDER_INDEX_MAX_WINDOWS = 200  # eth_getLogs per run, multicall is used until caught up
+PERSIST_CACHE = True  # keep token metadata in data/cache between runs
 
 #######################################################################
 #                        Intract Settings                             #
@@ -18,9 +38,11 @@ MAX_GWEI = 30
 ALLOW_MULTIPLE_MINTS = False
 USE_REF = False
 REF_CODE = ""
+SESSION_TTL = 24 * 60 * 60  # seconds a cached Intract session is reused
 
 #######################################################################
 #                        Send A0GI Settings                           #
 #######################################################################
 
 SEND_VALUE_PERCENTAGE = [5, 10]
+SEND_BATCH_SIZE = 1  # transfers per broadcast batch, SLEEP_BETWEEN_WALLETS apart